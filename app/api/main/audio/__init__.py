@@ -0,0 +1,28 @@
+"""
+Audio Transport
+Binary framing and codecs for audio carried over the call WebSocket.
+"""
+
+from .frames import (
+    CODEC_OPUS,
+    CODEC_PCM16,
+    FLAG_END,
+    HEADER,
+    Frame,
+    FrameError,
+    encode_frame,
+    frame_stream,
+    parse_frame,
+    read_wav_pcm,
+)
+from .codecs import (
+    CODECS,
+    SUFFIXES,
+    CodecError,
+    StreamDecoder,
+    aencode_opus,
+    available_codecs,
+    encode_opus,
+    opus_available,
+    read_line,
+)
@@ -0,0 +1,167 @@
+"""
+Audio Codecs
+Opus support for the audio transport and the line cache, through an
+`ffmpeg` binary with libopus. Without one everything stays PCM/WAV.
+
+Files and socket streams use Ogg/Opus; the microphone may also arrive as
+WebM/Opus (what Chromium's MediaRecorder produces), which ffmpeg demuxes
+the same way. Work on the event loop goes through asyncio subprocesses, so
+encoding never blocks it; `encode_opus` is the blocking form for executor
+threads.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from pathlib import Path
+import shutil
+import subprocess
+from typing import AsyncIterator
+
+from .frames import CODEC_OPUS, CODEC_PCM16, read_wav_pcm
+
+FFMPEG = os.getenv("ETHER_FFMPEG", "ffmpeg")
+OPUS_BITRATE = os.getenv("ETHER_OPUS_BITRATE", "24k")
+# Opus always decodes at 48 kHz; frames of Opus streams carry this rate.
+OPUS_RATE = 48000
+# Rate that cached Opus lines are decoded to for PCM-only clients.
+PCM_PLAYBACK_RATE = 24000
+
+# Stored line formats and their file suffixes.
+SUFFIXES = {"wav": ".wav", "opus": ".ogg"}
+# Socket codec names and their frame codec ids.
+CODECS = {"pcm": CODEC_PCM16, "opus": CODEC_OPUS}
+
+
+class CodecError(RuntimeError):
+    """Raised when ffmpeg fails to encode or decode."""
+
+
+def opus_available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+
+def available_codecs() -> list[str]:
+    """Socket codecs this host can both encode and decode."""
+    return list(CODECS) if opus_available() else ["pcm"]
+
+
+def _encode_args(sample_rate: int) -> list[str]:
+    return [
+        FFMPEG, "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+
+
+def _decode_args(sample_rate: int, streaming: bool = False) -> list[str]:
+    # Streaming input: probe as little as possible so PCM starts flowing early.
+    probe = ["-probesize", "4096", "-analyzeduration", "0", "-fflags", "nobuffer"] if streaming else []
+    return [
+        FFMPEG, "-hide_banner", "-loglevel", "error", *probe,
+        "-i", "pipe:0", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "pipe:1",
+    ]
+
+
+def encode_opus(pcm: bytes, sample_rate: int) -> bytes:
+    """Encodes 16-bit mono PCM to Ogg/Opus. Blocking."""
+    result = subprocess.run(_encode_args(sample_rate), input=pcm, capture_output=True)
+    if result.returncode != 0:
+        raise CodecError(f"Opus encoding failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+async def _pipe(args: list[str], data: bytes) -> bytes:
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        out, err = await proc.communicate(data)
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise CodecError(err.decode(errors="replace").strip() or f"ffmpeg exited with code {proc.returncode}")
+    return out
+
+
+async def aencode_opus(pcm: bytes, sample_rate: int) -> bytes:
+    return await _pipe(_encode_args(sample_rate), pcm)
+
+
+async def adecode_pcm(data: bytes, sample_rate: int) -> bytes:
+    """Decodes any container/codec ffmpeg reads to 16-bit mono PCM."""
+    return await _pipe(_decode_args(sample_rate), data)
+
+
+async def read_line(path: Path, codec: str) -> tuple[bytes, int, int]:
+    """
+    Loads a cached line for a socket that negotiated `codec`, converting
+    between WAV and Ogg/Opus if the stored format differs. Returns
+    (payload, sample rate, frame codec id).
+    """
+    path = Path(path)
+    if path.suffix == SUFFIXES["opus"]:
+        data = await asyncio.to_thread(path.read_bytes)
+        if codec == "opus":
+            return data, OPUS_RATE, CODEC_OPUS
+        return await adecode_pcm(data, PCM_PLAYBACK_RATE), PCM_PLAYBACK_RATE, CODEC_PCM16
+    pcm, sample_rate = await asyncio.to_thread(read_wav_pcm, path)
+    if codec == "opus":
+        return await aencode_opus(pcm, sample_rate), OPUS_RATE, CODEC_OPUS
+    return pcm, sample_rate, CODEC_PCM16
+
+
+class StreamDecoder:
+    """
+    Decodes one compressed stream (e.g. a push-to-talk press) to PCM as its
+    bytes arrive. `write` feeds container bytes in; `pcm` yields decoded
+    16-bit samples until `finish` has been called and ffmpeg has drained.
+    """
+
+    def __init__(self, sample_rate: int, read_bytes: int = 4096):
+        self.sample_rate = sample_rate
+        self.read_bytes = read_bytes
+        self._proc: asyncio.subprocess.Process | None = None
+
+    async def start(self) -> "StreamDecoder":
+        self._proc = await asyncio.create_subprocess_exec(
+            *_decode_args(self.sample_rate, streaming=True),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        return self
+
+    async def write(self, data: bytes | memoryview):
+        if not data:
+            return
+        try:
+            self._proc.stdin.write(data)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise CodecError(f"decoder exited with code {self._proc.returncode}") from e
+
+    async def pcm(self) -> AsyncIterator[bytes]:
+        leftover = b""
+        while data := await self._proc.stdout.read(self.read_bytes):
+            data = leftover + data
+            cut = len(data) & ~1  # whole samples only
+            leftover = data[cut:]
+            if cut:
+                yield data[:cut]
+
+    def finish(self):
+        """Marks the end of the input; `pcm` ends once the rest is decoded."""
+        if self._proc is not None and not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+
+    async def close(self):
+        if self._proc is None:
+            return
+        self.finish()
+        if self._proc.returncode is None:
+            try:
+                self._proc.kill()
+            except ProcessLookupError:
+                pass
+        await self._proc.wait()
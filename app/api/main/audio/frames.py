@@ -0,0 +1,107 @@
+"""
+Audio Frames
+Every binary WebSocket message on `/ws-audio` is one frame: a fixed 16-byte
+little-endian header followed by the payload.
+
+    offset  size  field
+    0       1     version (1)
+    1       1     codec (0 = PCM s16le mono, 1 = Opus in Ogg or WebM)
+    2       2     flags (bit 0: last frame of its stream)
+    4       4     stream id
+    8       4     sequence number within the stream
+    12      4     sample rate in Hz
+
+The client's microphone is one stream; each line the server voices is
+another. Parsing never copies the payload: it is handed out as a
+memoryview, and PCM as a numpy view over the received message. An Opus
+stream's payloads are consecutive pieces of one container file.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import struct
+from typing import Iterator
+import wave
+
+import numpy as np
+
+VERSION = 1
+HEADER = struct.Struct("<BBHIII")
+CODEC_PCM16 = 0
+CODEC_OPUS = 1
+FLAG_END = 0x1
+
+# Payload size for outgoing frames: 100 ms of PCM at 16 kHz.
+FRAME_BYTES = 3200
+
+
+class FrameError(ValueError):
+    """Raised for a binary message that isn't a valid frame."""
+
+
+@dataclass(frozen=True)
+class Frame:
+    codec: int
+    flags: int
+    stream_id: int
+    seq: int
+    sample_rate: int
+    payload: memoryview
+
+    @property
+    def end(self) -> bool:
+        return bool(self.flags & FLAG_END)
+
+    def samples(self) -> np.ndarray:
+        """The payload as int16 samples, without copying it."""
+        if self.codec != CODEC_PCM16:
+            raise FrameError(f"codec {self.codec} is not PCM")
+        if len(self.payload) % 2:
+            raise FrameError("PCM payload has an odd number of bytes")
+        return np.frombuffer(self.payload, dtype="<i2")
+
+
+def parse_frame(data: bytes | bytearray | memoryview) -> Frame:
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise FrameError(f"frame is shorter than its {HEADER.size}-byte header")
+    version, codec, flags, stream_id, seq, sample_rate = HEADER.unpack_from(view)
+    if version != VERSION:
+        raise FrameError(f"unsupported frame version {version}")
+    return Frame(codec, flags, stream_id, seq, sample_rate, view[HEADER.size:])
+
+
+def encode_frame(
+    payload: bytes | memoryview,
+    stream_id: int,
+    seq: int,
+    sample_rate: int,
+    codec: int = CODEC_PCM16,
+    flags: int = 0,
+) -> bytes:
+    return HEADER.pack(VERSION, codec, flags, stream_id, seq, sample_rate) + payload
+
+
+def frame_stream(
+    payload: bytes,
+    stream_id: int,
+    sample_rate: int,
+    codec: int = CODEC_PCM16,
+    frame_bytes: int = FRAME_BYTES,
+) -> Iterator[bytes]:
+    """Splits audio into frames of one stream; the last one carries FLAG_END."""
+    view = memoryview(payload)
+    total = len(view)
+    if total == 0:
+        yield encode_frame(b"", stream_id, 0, sample_rate, codec, flags=FLAG_END)
+        return
+    for seq, start in enumerate(range(0, total, frame_bytes)):
+        end = start + frame_bytes >= total
+        yield encode_frame(view[start:start + frame_bytes], stream_id, seq, sample_rate, codec, FLAG_END if end else 0)
+
+
+def read_wav_pcm(path) -> tuple[bytes, int]:
+    """Reads a mono 16-bit WAV; returns (PCM bytes, sample rate)."""
+    with wave.open(str(path), "rb") as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1:
+            raise FrameError(f"{path}: expected mono 16-bit PCM")
+        return w.readframes(w.getnframes()), w.getframerate()
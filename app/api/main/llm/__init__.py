@@ -29,6 +29,13 @@ def get_llm_connector() -> BaseLLM:
                 model=provider_config["model"],
                 base_url=provider_config["base_url"],
                 api_key=provider_config["api_key"],
+                timeout_s=provider_config.get("timeout_s", 30.0),
+                connect_timeout_s=provider_config.get("connect_timeout_s", 5.0),
+                max_connections=provider_config.get("max_connections", 16),
+                max_keepalive=provider_config.get("max_keepalive", 8),
+                max_concurrency=provider_config.get("max_concurrency", 8),
+                cache_prompt=provider_config.get("cache_prompt", False),
+                slots=provider_config.get("slots", 0),
             )
         elif provider_name == "google-gemini":
             return Gemini(
@@ -41,6 +48,29 @@ def get_llm_connector() -> BaseLLM:
         raise KeyError(f"Missing required configuration key for '{provider_name}': {e}")
 
 
-# Create a singleton instance of the connector to be used by the application.
-# This avoids re-reading the config file on every call.
-llm_connector = get_llm_connector()
+# The shared connector is created on first use (or by the API's startup),
+# not at import, so importing the package stays cheap.
+_connector: BaseLLM | None = None
+
+
+def get_llm() -> BaseLLM:
+    """Returns the application-wide connector, creating it on first use."""
+    global _connector
+    if _connector is None:
+        _connector = get_llm_connector()
+    return _connector
+
+
+async def close_llm() -> None:
+    """Closes the shared connector's pooled connections, if it was ever created."""
+    global _connector
+    if _connector is not None:
+        await _connector.aclose()
+        _connector = None
+
+
+def __getattr__(name: str):
+    # Backwards compatibility for `from app.api.main.llm import llm_connector`.
+    if name == "llm_connector":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+import asyncio
+from typing import AsyncIterator
 import yaml
 from pathlib import Path
 
@@ -17,19 +19,79 @@ class BaseLLM(ABC):
         self.model = model
 
     @abstractmethod
-    def generate_response(self, system_prompt: str, user_prompt: str) -> str:
+    def generate_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> str:
         """
         Generates a response from the language model.
 
         Args:
             system_prompt: The system prompt that defines the AI's persona and instructions.
             user_prompt: The user's input to which the AI should respond.
+            history: Earlier chat messages (`{"role", "content"}`), oldest first,
+                placed between the system prompt and `user_prompt`.
+            cache_key: Identifies a conversation, so connectors whose server
+                keeps a prompt cache can route its requests to the same slot.
 
         Returns:
             The text response generated by the model.
         """
         pass
 
+    async def agenerate_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        """
+        Async variant of `generate_response` for use on the event loop.
+
+        Connectors without a native async client fall back to running the
+        blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_response, system_prompt, user_prompt, history, cache_key)
+
+    async def astream_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streams the response as text deltas.
+
+        The default implementation yields the complete response as a single
+        delta; connectors with server-side streaming should override it.
+        """
+        yield await self.agenerate_response(system_prompt, user_prompt, history, cache_key)
+
+    async def aclose(self) -> None:
+        """Releases any pooled network resources held by the connector."""
+        return None
+
+    @staticmethod
+    def chat_messages(system_prompt: str, user_prompt: str, history: list[dict] | None = None) -> list[dict]:
+        """
+        Builds a chat message list. The system prompt and history come first
+        and change only at the end between turns, so servers with a prompt
+        cache can reuse the shared prefix. Consecutive messages with the same
+        role are merged for chat templates that require alternating roles.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        for m in [*(history or []), {"role": "user", "content": user_prompt}]:
+            if messages[-1]["role"] == m["role"]:
+                messages[-1] = {"role": m["role"], "content": f"{messages[-1]['content']}\n{m['content']}"}
+            else:
+                messages.append({"role": m["role"], "content": m["content"]})
+        return messages
+
     @staticmethod
     def load_config() -> dict:
         """Loads the LLM configuration from the root `llm_config.yaml` file."""
@@ -31,13 +31,22 @@ class Gemini(BaseLLM):
         #     raise
         pass
 
-    def generate_response(self, system_prompt: str, user_prompt: str) -> str:
+    def generate_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> str:
         """
         Generates a response from Gemini.
 
         Note: The Gemini API prefers a combined prompt rather than a separate "system" role.
         """
-        # Combine the system and user prompts into a single prompt for Gemini.
+        # Combine the system prompt, earlier turns and user prompt into a single prompt for Gemini.
+        transcript = "".join(f"{m['role']}: {m['content']}\n" for m in history or [])
+        if transcript:
+            system_prompt = f"{system_prompt}\n\n---\n\nConversation so far:\n{transcript}"
         full_prompt = f"{system_prompt}\n\n---\n\nUser query: \"{user_prompt}\""
 
         # try:
@@ -1,10 +1,34 @@
-from openai import OpenAI
+import asyncio
+import json
+from typing import AsyncIterator
+import zlib
+
+import httpx
 from .base import BaseLLM
 
+# Unread deltas buffered per stream. Replies are far shorter; a caller this
+# far behind has stalled, and the stream is cut rather than held open.
+STREAM_BUFFER_DELTAS = 4096
+
+FALLBACK_RESPONSE = "Sorry, I'm having a little trouble thinking right now. Let's try again in a moment."
+
+
 class LMStudio(BaseLLM):
     """LLM connector for LM Studio, which uses an OpenAI-compatible API."""
 
-    def __init__(self, model: str, base_url: str, api_key: str):
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        api_key: str,
+        timeout_s: float = 30.0,
+        connect_timeout_s: float = 5.0,
+        max_connections: int = 16,
+        max_keepalive: int = 8,
+        max_concurrency: int = 8,
+        cache_prompt: bool = False,
+        slots: int = 0,
+    ):
         """
         Initializes the LM Studio connector.
 
@@ -12,24 +36,174 @@ class LMStudio(BaseLLM):
             model: The model identifier.
             base_url: The base URL of the local server (e.g., "http://localhost:1234/v1").
             api_key: The API key (often a placeholder for local models).
+            timeout_s: Read timeout for a completion request.
+            connect_timeout_s: Timeout for establishing a connection.
+            max_connections: Upper bound on pooled connections to the server.
+            max_keepalive: Idle connections kept open for reuse.
+            max_concurrency: Requests allowed in flight at once; extra callers wait.
+            cache_prompt: Ask the server to keep each request's prompt in its KV
+                cache and reuse the longest shared prefix (llama.cpp `cache_prompt`).
+            slots: Number of server slots (llama.cpp `--parallel`). When set,
+                each conversation is pinned to one slot via `id_slot`, so its
+                cached prefix is still there on the next turn. 0 lets the server pick.
         """
         super().__init__(model=model, api_key=api_key)
-        self.client = OpenAI(base_url=base_url, api_key=self.api_key)
+        self.base_url = base_url.rstrip("/")
+        self._client = None  # sync OpenAI client, built on first use
+
+        self._timeout = httpx.Timeout(timeout_s, connect=connect_timeout_s)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self._max_concurrency = max_concurrency
+        self.cache_prompt = cache_prompt
+        self.slots = slots
+        # Created lazily so they bind to the running event loop.
+        self._aclient: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def client(self):
+        """The blocking OpenAI client used by `generate_response`."""
+        if self._client is None:
+            from openai import OpenAI  # only the sync path needs the SDK
+            self._client = OpenAI(base_url=self.base_url, api_key=self.api_key)
+        return self._client
 
-    def generate_response(self, system_prompt: str, user_prompt: str) -> str:
+    def _server_options(self, cache_key: str | None) -> dict:
+        """Non-OpenAI request fields for prompt caching; servers ignore ones they don't know."""
+        options = {}
+        if self.cache_prompt:
+            options["cache_prompt"] = True
+        if self.slots and cache_key:
+            options["id_slot"] = zlib.crc32(cache_key.encode("utf-8")) % self.slots
+        return options
+
+    def _payload(self, system_prompt, user_prompt, history, cache_key, stream: bool = False) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": self.chat_messages(system_prompt, user_prompt, history),
+            "temperature": 0.7,
+            **self._server_options(cache_key),
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """Returns the shared keep-alive client, creating it on first use."""
+        if self._aclient is None or self._aclient.is_closed:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self._timeout,
+                limits=self._limits,
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._aclient
+
+    def generate_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> str:
         """Generates a response using the OpenAI chat completions format."""
         try:
             completion = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+                messages=self.chat_messages(system_prompt, user_prompt, history),
                 temperature=0.7,  # A balanced value for creative but not chaotic responses
+                extra_body=self._server_options(cache_key) or None,
             )
             response = completion.choices[0].message.content
             return response.strip() if response else "..."
         except Exception as e:
             print(f"ERROR: Could not connect to LM Studio. Is the server running? Details: {e}")
             # Return a fallback response so the application doesn't crash.
-            return "Sorry, I'm having a little trouble thinking right now. Let's try again in a moment."
+            return FALLBACK_RESPONSE
+
+    async def agenerate_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        """Generates a response over the pooled async client."""
+        client = self._async_client()
+        payload = self._payload(system_prompt, user_prompt, history, cache_key)
+        try:
+            async with self._semaphore:
+                r = await client.post("/chat/completions", json=payload)
+            r.raise_for_status()
+            response = r.json()["choices"][0]["message"]["content"]
+            return response.strip() if response else "..."
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            print(f"ERROR: Could not connect to LM Studio. Is the server running? Details: {e}")
+            return FALLBACK_RESPONSE
+
+    async def astream_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        history: list[dict] | None = None,
+        cache_key: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streams content deltas from the server-sent event stream.
+
+        The stream is read by its own task into a buffer, so the concurrency
+        slot is released as soon as the server is done. A caller that reads
+        slowly (e.g. held back by a slow client) only delays itself.
+        """
+        client = self._async_client()
+        payload = self._payload(system_prompt, user_prompt, history, cache_key, stream=True)
+        deltas: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(self._read_stream(client, payload, deltas))
+        streamed = False
+        try:
+            while (delta := await deltas.get()) is not None:
+                streamed = True
+                yield delta
+            error = await reader
+        finally:
+            reader.cancel()  # the caller stopped early; free the slot and connection
+        if error is not None:
+            print(f"ERROR: Could not connect to LM Studio. Is the server running? Details: {error}")
+            if not streamed:
+                yield FALLBACK_RESPONSE
+
+    async def _read_stream(self, client: httpx.AsyncClient, payload: dict, deltas: asyncio.Queue) -> Exception | None:
+        """Reads one streamed completion into `deltas`, then None. Returns the error that ended it, if any."""
+        try:
+            async with self._semaphore:
+                async with client.stream("POST", "/chat/completions", json=payload) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0].get("delta", {})
+                        except (ValueError, KeyError, IndexError):
+                            continue
+                        if delta.get("content"):
+                            if deltas.qsize() >= STREAM_BUFFER_DELTAS:
+                                # The caller has stopped reading; don't hold the slot for it.
+                                return RuntimeError(f"stream abandoned after {STREAM_BUFFER_DELTAS} unread deltas")
+                            deltas.put_nowait(delta["content"])
+            return None
+        except httpx.HTTPError as e:
+            return e
+        finally:
+            deltas.put_nowait(None)
+
+    async def aclose(self) -> None:
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
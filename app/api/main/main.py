@@ -1,13 +1,37 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from pathlib import Path
 import json
-from app.api.main.orchestrator.state import SceneState
-from app.api.main.orchestrator.router import Director
-# from genai_processors import Pipeline
+from app.api.main.audio import (
+    CODEC_OPUS,
+    CodecError,
+    FrameError,
+    StreamDecoder,
+    available_codecs,
+    frame_stream,
+    parse_frame,
+    read_line,
+)
+from app.api.main.llm import close_llm, get_llm
+from app.api.main.orchestrator.nlg import AUDIO_FORMAT, audio_cache, persona_registry
+from app.api.main.orchestrator.pipeline import BLOCK, COALESCE, DROP_OLDEST, Pipeline, PipelineClosed
+from app.api.main.orchestrator.scenes import scene_registry
+from app.api.main.orchestrator.session import SessionManager, SessionLimitError
+from app.api.main.orchestrator.scheduler import BackgroundScheduler
+from app.api.main.orchestrator.tts_client import RemoteTTS
+from app.api.main.orchestrator.warmup import prerender_stock_lines
+from app.api.main.stt import StreamingRecognizer, STTEvent, get_stt_pool
+from app.api.main.telemetry import gauges, render_metrics, span, turn_trace
 import asyncio
+from collections import Counter
+from contextlib import aclosing, asynccontextmanager, contextmanager
+import itertools
 import logging
-import whisper
+import os
+import time
+import wave
+
+import numpy as np
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -20,26 +44,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-
 # --- Application State ---
 app_state = {
-    "whisper_model": None,
+    "stt_pool": None,
+    "tts_model": None,
     "websockets": set(),
+    # Startup status per subsystem: {"ready", "seconds", "error"}
+    "subsystems": {},
 }
+# Subsystems that must be up before the service reports ready. TTS is
+# optional: without it lines go out as text.
+REQUIRED_SUBSYSTEMS = ("scene", "personas", "llm", "stt")
 
+# Lines are voiced by the TTS service when one is configured.
+TTS_BASE_URL = os.getenv("TTS_BASE_URL")
+PRERENDER_LINES = os.getenv("ETHER_PRERENDER_LINES", "1") == "1"
 
-# --- Model Loading ---
-def load_models_sync():
-    """Synchronous function to load all models."""
-    # Load Whisper
-    logger.info("Loading Whisper model...")
+# --- Sessions ---
+# The scene is compiled once; every connection gets its own state from it.
+MAX_SESSIONS = int(os.getenv("ETHER_MAX_SESSIONS", "500"))
+SESSION_IDLE_S = float(os.getenv("ETHER_SESSION_IDLE_S", "900"))
+SESSION_SWEEP_S = 30.0
+# Seeds each session's aside RNG for reproducible load tests; unset means random.
+ASIDE_SEED = os.getenv("ETHER_ASIDE_SEED") or None
+
+# --- Call pipeline ---
+# Queue bounds between a call's stages (see call_pipeline).
+AUDIO_QUEUE_SIZE = int(os.getenv("ETHER_AUDIO_QUEUE_SIZE", "50"))  # mic chunks awaiting recognition
+EVENT_QUEUE_SIZE = 16  # recognizer events awaiting the director
+SEND_QUEUE_SIZE = int(os.getenv("ETHER_SEND_QUEUE_SIZE", "50"))  # messages awaiting the client
+
+
+# --- Startup ---
+@contextmanager
+def startup_stage(name: str, required: bool = False):
+    """
+    Times one startup step and records the outcome for /readyz. A failed
+    step is logged and skipped unless it is `required`.
+    """
+    status = app_state["subsystems"].setdefault(name, {"ready": False, "seconds": None, "error": None})
+    start = time.perf_counter()
     try:
-        # Using "tiny.en" for a smaller footprint, adjust as needed
-        app_state["whisper_model"] = whisper.load_model("tiny.en")
-        logger.info("Whisper model loaded successfully.")
+        yield status
     except Exception as e:
-        logger.error(f"Could not load Whisper model: {e}", exc_info=True)
+        status.update(ready=False, error=f"{type(e).__name__}: {e}")
+        logger.error(f"Startup: {name} failed after {time.perf_counter() - start:.2f}s: {e}", exc_info=True)
+        if required:
+            raise
+    else:
+        status.update(ready=True, error=None)
+        logger.info(f"Startup: {name} ready in {time.perf_counter() - start:.2f}s")
+    finally:
+        status["seconds"] = round(time.perf_counter() - start, 3)
+
+
+def load_models_sync():
+    """Synchronous function to load all models."""
+    # Load the STT model pool (backend and size come from stt_config.yaml)
+    with startup_stage("stt"):
+        pool = get_stt_pool()
+        pool.load()
+        app_state["stt_pool"] = pool
+        logger.info(f"STT model pool loaded ({pool.size} instances).")
+
+    if TTS_BASE_URL:
+        with startup_stage("tts"):
+            tts = RemoteTTS(TTS_BASE_URL, format=AUDIO_FORMAT)
+            if not tts.probe():
+                raise ConnectionError(f"TTS service at {TTS_BASE_URL} is not reachable; lines will be text only.")
+            app_state["tts_model"] = tts
+            logger.info(f"Using TTS service at {TTS_BASE_URL} ({tts.model_id}).")
 
 
 async def load_models_async():
@@ -47,103 +121,440 @@ async def load_models_async():
     loop = asyncio.get_event_loop()
     await loop.run_in_executor(None, load_models_sync)
 
+    if PRERENDER_LINES and app_state["tts_model"] is not None:
+        with startup_stage("prerender"):
+            state = scene_registry.load(scene_path).new_state()
+            cached = await prerender_stock_lines(state, app_state["tts_model"])
+            logger.info(f"Pre-rendered {cached} stock lines into the audio cache.")
+
 
-@app.on_event("startup")
-async def startup_event():
-    """On startup, kick off the model loading in the background."""
+async def evict_idle_sessions():
+    """Periodically closes sessions whose clients have gone quiet."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_S)
+        for session in sessions.evict_idle():
+            logger.info(f"Evicting idle session {session.session_id}.")
+            if session.transport is not None:
+                try:
+                    await session.transport.close(code=1001)
+                except Exception:
+                    pass
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Staged startup. The scene, personas and LLM connector are cheap and
+    required, so they load before serving (an invalid scene fails fast).
+    Models load in the background; /readyz reports when they are up.
+    """
     logger.info("Application startup...")
-    asyncio.create_task(load_models_async())
+    with startup_stage("scene", required=True):
+        scene_registry.load(scene_path)
+    with startup_stage("personas", required=True) as status:
+        status["count"] = persona_registry.load_all()
+    with startup_stage("llm", required=True):
+        get_llm()
+    tasks = [asyncio.create_task(load_models_async()), asyncio.create_task(evict_idle_sessions())]
+    background_scheduler.start()
+    yield
+    # Stop background work and close pooled connections to the model servers.
+    for task in tasks:
+        task.cancel()
+    await background_scheduler.stop()
+    await close_llm()
+    if isinstance(app_state["tts_model"], RemoteTTS):
+        await app_state["tts_model"].aclose()
+        app_state["tts_model"].close()
+
 
+app = FastAPI(lifespan=lifespan)
 
 scene_path = Path("scenes/family_party.yaml")
-state = SceneState.from_yaml(scene_path)
-director = Director(state)
+sessions = SessionManager(
+    scene_path,
+    max_sessions=MAX_SESSIONS,
+    idle_timeout_s=SESSION_IDLE_S,
+    tts_model_getter=lambda: app_state["tts_model"],
+    seed=ASIDE_SEED,
+)
+# Pushes `background` asides to every live session between turns.
+background_scheduler = BackgroundScheduler(sessions)
+turn_ids = itertools.count(1)
+
+
+def pipeline_depths():
+    """Messages queued in each pipeline stage, summed over live calls."""
+    depths = Counter()
+    for session in sessions:
+        if session.pipeline is not None:
+            for name, stage in session.pipeline.stages.items():
+                depths[name] += len(stage.queue)
+    return [((name,), depth) for name, depth in depths.items()]
+
+
+gauges.add("ether_active_sessions", "Open call sessions.", lambda: len(sessions))
+gauges.add("ether_websockets", "Connected WebSocket clients.", lambda: len(app_state["websockets"]))
+gauges.add("ether_background_scheduled", "Sessions waiting on the background aside scheduler.", lambda: len(background_scheduler))
+gauges.add_labeled("ether_pipeline_queue_depth", "Items queued per call pipeline stage, over all calls.", ["stage"], pipeline_depths)
+gauges.add("ether_audio_cache_bytes", "Size of the audio cache on disk.", lambda: audio_cache.stats()["bytes"])
+gauges.add("ether_audio_cache_entries", "Lines in the audio cache.", lambda: audio_cache.stats()["entries"])
 
 @app.get("/")
 async def root():
     return HTMLResponse("<h1>Backend OK</h1><p>Connect your frontend to <code>/ws</code>.</p>")
 
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"ok": True}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-step latency histograms, sessions and queue depths."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: every required subsystem has loaded. Reports each one's status and load time."""
+    subsystems = app_state["subsystems"]
+    ready = all(subsystems.get(name, {}).get("ready") for name in REQUIRED_SUBSYSTEMS)
+    return JSONResponse(
+        {"ready": ready, "subsystems": subsystems, "sessions": len(sessions)},
+        status_code=200 if ready else 503,
+    )
+
+async def handle_control(session, data: dict) -> bool:
+    """Handles the control messages shared by /ws and /ws-audio. Returns False to end the call."""
+    state = session.state
+    if data.get("type") == "set_bg_energy":
+        state.intensity = float(data.get("value", state.intensity))
+        await session.outbox.put({"type": "ack", "ok": True})
+    elif data.get("type") == "end_call":
+        await session.outbox.put({"type": "plan", "data": {"controls": {"end_call": True}}})
+        return False
+    return True
+
+
+async def run_turn(session, user_text: str):
+    # Foreground audio goes out sentence by sentence as `plan_chunk`
+    # messages, followed by the closing `plan`.
+    director = session.director
+    session.in_turn = True
+    try:
+        # Spans of this turn, including its LLM and TTS tasks, are logged together when it ends.
+        with turn_trace(f"{session.session_id[:8]}-{next(turn_ids)}") as trace:
+            # aclosing: a cancelled send must also stop the LLM stream and TTS behind it.
+            async with aclosing(director.step_stream(user_text)) as messages:
+                async for message in messages:
+                    # Waits while the client is behind, which holds back TTS and the LLM.
+                    await session.outbox.put(message)
+                    if message["type"] == "plan_chunk":
+                        trace.first_audio()
+        session.in_turn = False
+        session.touch()  # background asides wait for the reply to settle
+
+        followup = director.followup()
+        if followup is not None:
+            # e.g. the next speaker's entrance after a handoff. Its wait is
+            # the scene's deliberate handoff window, not turn latency.
+            with span("handoff_entrance"):
+                plan = await followup
+            await session.outbox.put({"type": "plan", "data": plan})
+            session.touch()
+    except (asyncio.CancelledError, PipelineClosed):
+        raise
+    except Exception as e:
+        logger.error(f"Turn failed: {e}", exc_info=True)
+    finally:
+        session.in_turn = False
+
+
+async def send_message(ws: WebSocket, session, message: dict):
+    """
+    Writes one message to the client. On connections with inline audio, a
+    voiced line is sent as audio frames right after its `plan_chunk` or
+    `plan`, which carries the frames' `stream` id instead of a file URL.
+    """
+    entry = None
+    if message["type"] == "plan_chunk":
+        entry = message["data"]
+    elif message["type"] == "plan":
+        entry = message["data"].get("foreground")
+    path = audio_cache.path_for(entry.get("line")) if entry and session.inline_audio else None
+    # Runs in the send stage, outside the turn's trace: ws_send only reaches the histogram.
+    if path is None:
+        with span("ws_send"):
+            await ws.send_json(message)
+        return
+    try:
+        # Converted only if the cache's format isn't the one negotiated.
+        payload, sample_rate, codec = await read_line(path, session.audio_codec)
+    except (OSError, EOFError, FrameError, CodecError, wave.Error) as e:
+        logger.warning(f"Could not read {path} for inline audio: {e}")
+        await ws.send_json(message)
+        return
+
+    stream_id = next(session.audio_streams)
+    entry["line"] = None
+    entry["stream"] = stream_id
+    with span("ws_send"):
+        await ws.send_json(message)
+        for frame in frame_stream(payload, stream_id, sample_rate, codec):
+            await ws.send_bytes(frame)
+
+
+async def barge_in(session):
+    """
+    Stops the session's reply if the caller talks over it: what is still
+    queued for the client is dropped, and the client is told to drop any
+    audio it already has.
+    """
+    turn = session.turn
+    if session.cancel_turn():
+        await asyncio.gather(turn, return_exceptions=True)
+        session.outbox.discard(lambda m: m["type"] in ("plan_chunk", "plan"))
+        await session.outbox.put({"type": "interrupt"})
+
+
+async def start_turn(session, user_text: str):
+    """Runs a reply as the session's turn task, so the call keeps listening while it plays."""
+    await barge_in(session)
+    session.turn = asyncio.create_task(run_turn(session, user_text))
+
+
+# End of an utterance in a call's audio queue: recognize what is buffered now.
+FLUSH = object()
+
+
+def call_pipeline(ws: WebSocket, session, recognizer: StreamingRecognizer | None = None) -> Pipeline:
+    """
+    Builds and starts a call's stages: speech recognition (voice calls
+    only), then the director, then sending. The send stage is the only
+    writer to the socket, so replies, transcripts and background chatter
+    leave in order and a slow client backs up into bounded queues:
+
+    - stt: microphone audio; blocks, so a slow recognizer slows the socket reader.
+    - director: recognizer events; a newer partial transcript replaces a queued one.
+    - send: messages for the client; partial transcripts and background
+      chatter are dropped first, replies are waited for.
+    """
+    async def recognize(item, emit):
+        if item is FLUSH:
+            event = await recognizer.flush()
+            if event:
+                await emit(event)
+            return
+        async for event in recognizer.feed(item):
+            await emit(event)
+
+    async def direct(event: STTEvent, emit):
+        # Act before telling the client: the send queue may be full of the
+        # reply being talked over, and only barging in makes room.
+        if event.type == "speech_start":
+            await barge_in(session)
+        elif event.type == "final":
+            await start_turn(session, event.text)
+        if recognizer is None:
+            return
+        notice = {"type": f"stt_{event.type}", "text": event.text}
+        if event.type == "final":
+            await emit(notice)
+        else:
+            session.outbox.offer(notice)  # transient; dropped rather than waited for
+
+    async def send(message: dict, emit):
+        await send_message(ws, session, message)
+
+    pipeline = Pipeline(f"call-{session.session_id}")
+    if recognizer is not None:
+        pipeline.add("stt", recognize, AUDIO_QUEUE_SIZE, BLOCK)
+    pipeline.add(
+        "director", direct, EVENT_QUEUE_SIZE, COALESCE,
+        key=lambda event: event.type if event.type == "partial" else None,
+    )
+    pipeline.add(
+        "send", send, SEND_QUEUE_SIZE, DROP_OLDEST,
+        droppable=lambda message: message["type"] in ("stt_partial", "background"),
+    )
+    session.pipeline = pipeline
+    session.outbox = pipeline.queue("send")
+    return pipeline.start()
+
+
 @app.websocket("/ws")
 async def ws(ws: WebSocket):
     await ws.accept()
+    try:
+        session = sessions.open(transport=ws)
+    except SessionLimitError as e:
+        logger.warning(f"Rejecting client: {e}")
+        await ws.close(code=1013)  # Try Again Later
+        return
+
+    state = session.state
+    pipeline = call_pipeline(ws, session)
+    background_scheduler.add(session)
     app_state["websockets"].add(ws)
     logger.info(f"Client connected. Total clients: {len(app_state['websockets'])}")
+    ended = False
     try:
-        await ws.send_json({"type": "hello", "scene_id": state.scene_id, "title": state.title})
+        await session.outbox.put({
+            "type": "hello",
+            "session_id": session.session_id,
+            "scene_id": state.scene_id,
+            "title": state.title,
+        })
         while True:
             msg = await ws.receive_text()
+            session.touch()
             try:
                 data = json.loads(msg)
             except json.JSONDecodeError:
                 continue
 
             if data.get("type") == "user_transcript":
-                user_text = data.get("text", "")
-                plan = director.step(user_text)
-                await ws.send_json({"type": "plan", "data": plan})
-            elif data.get("type") == "set_bg_energy":
-                state.intensity = float(data.get("value", state.intensity))
-                await ws.send_json({"type": "ack", "ok": True})
-            elif data.get("type") == "end_call":
-                await ws.send_json({"type": "plan", "data": {"controls": {"end_call": True}}})
+                await pipeline.put(STTEvent("final", data.get("text", "")))
+            elif not await handle_control(session, data):
+                ended = True
                 break
     except WebSocketDisconnect:
         logger.info("Client disconnected.")
     finally:
-        app_state["websockets"].remove(ws)
+        # A call the client ended still gets its last messages.
+        await pipeline.stop(drain=ended)
+        sessions.close(session.session_id)
+        app_state["websockets"].discard(ws)
         logger.info(f"Client removed. Total clients: {len(app_state['websockets'])}")
 
 
-# @app.websocket("/ws-audio")
-# async def ws_audio(ws: WebSocket):
-#     """WebSocket endpoint for bidirectional audio streaming."""
-#     await ws.accept()
-#     logger.info("Audio client connected.")
-
-#     # 1. Create processor instances
-#     stt_proc = LocalSTTProcessor(app_state["whisper_model"])
-#     llm_proc = LocalLLMProcessor()
-#     tts_proc = LocalTTSProcessor()
-
-#     # 2. Define the pipeline
-#     pipeline = Pipeline(
-#         [stt_proc, llm_proc, tts_proc],
-#         input_queue_maxsize=50,  # Buffer for incoming audio chunks
-#         output_queue_maxsize=50, # Buffer for outgoing audio chunks
-#     )
-
-#     async def stream_from_client():
-#         """Task to receive audio from the client and feed it to the pipeline."""
-#         try:
-#             while True:
-#                 audio_chunk = await ws.receive_bytes()
-#                 await pipeline.process(audio_chunk)
-#         except WebSocketDisconnect:
-#             logger.info("Audio client disconnected (receiver).")
-#             await pipeline.stop() # Signal pipeline to shut down
-
-#     async def stream_to_client():
-#         """Task to send pipeline output (synthesized audio) back to the client."""
-#         try:
-#             async for audio_output in pipeline.output():
-#                 await ws.send_bytes(audio_output)
-#             logger.info("Finished sending audio back to client.")
-#         except WebSocketDisconnect:
-#             logger.info("Audio client disconnected (sender).")
-
-
-#     # 3. Run the pipeline and I/O tasks concurrently
-#     try:
-#         # Start the pipeline processing in the background
-#         pipeline_task = asyncio.create_task(pipeline.run())
-#         # Start client I/O tasks
-#         receiver_task = asyncio.create_task(stream_from_client())
-#         sender_task = asyncio.create_task(stream_to_client())
-
-#         # Wait for all tasks to complete
-#         await asyncio.gather(pipeline_task, receiver_task, sender_task)
-
-#     except Exception as e:
-#         logger.error(f"Error in audio pipeline: {e}", exc_info=True)
-#     finally:
-#         logger.info("Audio client connection closed.")
+def negotiate_codec(requested: str | None) -> str:
+    """Picks the codec for inline frames: the client's first preference this host can encode."""
+    available = available_codecs()
+    for codec in (requested or "").split(","):
+        if codec.strip() in available:
+            return codec.strip()
+    return "pcm"
+
+
+@app.websocket("/ws-audio")
+async def ws_audio(ws: WebSocket):
+    """
+    Voice call: the client streams its microphone as binary audio frames
+    (see audio.frames), either 16 kHz int16 PCM or Opus, and sends control
+    messages as JSON text. Recognition runs incrementally, so the caller
+    sees partial transcripts while talking and the turn starts as soon as
+    they stop. Voiced lines come back inline as frames on the same socket,
+    in the codec the client asked for with `?codec=opus,pcm` (preference
+    order); `hello` reports the choice.
+    """
+    await ws.accept()
+    stt_pool = app_state["stt_pool"]
+    if stt_pool is None:
+        await ws.send_json({"type": "error", "detail": "Speech recognition is still loading."})
+        await ws.close(code=1013)
+        return
+    try:
+        session = sessions.open(transport=ws)
+    except SessionLimitError as e:
+        logger.warning(f"Rejecting audio client: {e}")
+        await ws.close(code=1013)
+        return
+
+    state = session.state
+    session.inline_audio = True
+    session.audio_codec = negotiate_codec(ws.query_params.get("codec"))
+    recognizer = StreamingRecognizer(stt_pool.transcribe, executor=stt_pool.executor)
+    pipeline = call_pipeline(ws, session, recognizer)
+    background_scheduler.add(session)
+    # Compressed microphone streams, decoded to PCM as they arrive: stream id -> (decoder, feeding task)
+    decoders: dict[int, tuple[StreamDecoder, asyncio.Task]] = {}
+
+    async def forward(decoder: StreamDecoder):
+        async for pcm in decoder.pcm():
+            await pipeline.put(np.frombuffer(pcm, dtype="<i2"))
+
+    async def decoder_for(stream_id: int) -> StreamDecoder:
+        if stream_id not in decoders:
+            decoder = await StreamDecoder(recognizer.sample_rate).start()
+            decoders[stream_id] = (decoder, asyncio.create_task(forward(decoder)))
+        return decoders[stream_id][0]
+
+    async def end_stream(stream_id: int):
+        """Lets a compressed stream's decoder drain into the recognizer."""
+        decoder, task = decoders.pop(stream_id)
+        decoder.finish()
+        try:
+            await task
+        except CodecError as e:
+            logger.warning(f"Microphone stream {stream_id} failed to decode: {e}")
+        finally:
+            await decoder.close()
+
+    async def on_frame(data: bytes):
+        frame = parse_frame(data)
+        if frame.codec == CODEC_OPUS:
+            if "opus" not in available_codecs():
+                raise FrameError("this server can't decode Opus")
+            decoder = await decoder_for(frame.stream_id)
+            await decoder.write(frame.payload)
+            if frame.end:
+                await end_stream(frame.stream_id)
+            return
+        if frame.sample_rate != recognizer.sample_rate:
+            raise FrameError(f"expected {recognizer.sample_rate} Hz audio, got {frame.sample_rate} Hz")
+        # Waits while recognition is behind, so unread audio stays in the socket.
+        await pipeline.put(frame.samples())
+
+    app_state["websockets"].add(ws)
+    logger.info(f"Audio client connected. Total clients: {len(app_state['websockets'])}")
+    ended = False
+    try:
+        await session.outbox.put({
+            "type": "hello",
+            "session_id": session.session_id,
+            "scene_id": state.scene_id,
+            "title": state.title,
+            # Frames are sent in `codec`; the microphone may use any of `accepts`.
+            "audio": {"codec": session.audio_codec, "accepts": available_codecs()},
+        })
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            session.touch()
+
+            if msg.get("bytes") is not None:
+                try:
+                    await on_frame(msg["bytes"])
+                except (FrameError, CodecError) as e:
+                    await session.outbox.put({"type": "error", "detail": f"Bad audio frame: {e}"})
+                continue
+
+            try:
+                data = json.loads(msg.get("text") or "")
+            except json.JSONDecodeError:
+                continue
+            if data.get("type") == "flush":
+                # Push-to-talk released: end the utterance without waiting for silence.
+                for stream_id in list(decoders):
+                    await end_stream(stream_id)
+                await pipeline.put(FLUSH)
+            elif not await handle_control(session, data):
+                ended = True
+                break
+    except WebSocketDisconnect:
+        logger.info("Audio client disconnected.")
+    finally:
+        for decoder, task in decoders.values():
+            task.cancel()
+            await decoder.close()
+        await pipeline.stop(drain=ended)
+        recognizer.close()
+        sessions.close(session.session_id)
+        app_state["websockets"].discard(ws)
+        logger.info(f"Audio client removed. Total clients: {len(app_state['websockets'])}")
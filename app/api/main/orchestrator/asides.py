@@ -0,0 +1,103 @@
+"""
+Background Asides
+Weighted aside selection from a table built once per scene. Each draw is
+O(1) (Walker's alias method), so picking k asides for a turn costs O(k)
+no matter how many lines the scene has.
+"""
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+import random
+from typing import Iterable
+
+# Relative weight of a line by how close its speaker is to the phone.
+PROXIMITY_WEIGHT = {"near": 2.0, "far": 1.0}
+MAX_ASIDES_PER_TURN = 2
+NO_REPEAT_WINDOW = 4
+# Draws rejected by the no-repeat window before a slot is left empty.
+MAX_REDRAWS = 4
+
+
+@dataclass(frozen=True)
+class AsideLine:
+    speaker: str
+    line: str
+    proximity: str  # "near" | "far"
+
+
+class AsideTable:
+    """An immutable alias table over a scene's aside lines."""
+
+    def __init__(self, lines: Iterable[AsideLine]):
+        self.lines = tuple(lines)
+        n = len(self.lines)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if not n:
+            return
+
+        weights = [PROXIMITY_WEIGHT.get(a.proximity, 1.0) for a in self.lines]
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to float error.
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def draw(self, rng: random.Random) -> int:
+        i = rng.randrange(len(self.lines))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+    @classmethod
+    def from_scene(cls, background_asides, characters) -> AsideTable:
+        """Builds a table from raw scene data (`background_asides`, `characters`)."""
+        near = set(characters.get("foreground", ())) | set(characters.get("nearby", ()))
+        return cls(
+            AsideLine(group["speaker"], line, "near" if group["speaker"] in near else "far")
+            for group in background_asides if group.get("speaker")
+            for line in group.get("lines", [])
+        )
+
+
+class AsideSampler:
+    """
+    Per-session aside picker: a seeded RNG plus the recently played lines,
+    over a table shared by every session of the scene.
+    """
+
+    def __init__(self, seed=None, window: int = NO_REPEAT_WINDOW):
+        self.rng = random.Random(seed)
+        self.recent: deque[int] = deque(maxlen=window)
+
+    def pick(self, table: AsideTable, intensity: float, max_asides: int = MAX_ASIDES_PER_TURN) -> list[AsideLine]:
+        """
+        Each of `max_asides` slots fires with probability `intensity`, so a
+        quiet room has fewer asides. Lines in the no-repeat window are redrawn.
+        """
+        if not len(table):
+            return []
+        # The window can't exclude every line of a small table.
+        window = min(len(self.recent), len(table) - 1)
+        blocked = set(list(self.recent)[len(self.recent) - window:]) if window else set()
+        picked = []
+        for _ in range(max_asides):
+            if self.rng.random() >= intensity:
+                continue
+            for _ in range(MAX_REDRAWS):
+                i = table.draw(self.rng)
+                if i not in blocked:
+                    picked.append(i)
+                    blocked.add(i)
+                    self.recent.append(i)
+                    break
+        return [table.lines[i] for i in picked]
@@ -0,0 +1,183 @@
+"""
+Audio Cache
+Content-addressed store for synthesized lines. Files are named by a hash of
+(voice, text, model), so a line that has been spoken before is served from
+disk instead of being synthesized again. Total size is bounded with LRU
+eviction; recency is kept in memory and mirrored to file mtimes so it
+survives restarts.
+"""
+from __future__ import annotations
+import asyncio
+from collections import OrderedDict
+import hashlib
+import os
+from pathlib import Path
+import re
+import threading
+from typing import Awaitable, Callable
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class AudioCache:
+    def __init__(self, root: Path, url_prefix: str, max_bytes: int, suffix: str = ".wav"):
+        """
+        Args:
+            root: Directory the audio files live in.
+            url_prefix: Frontend-relative path that `root` is served under.
+            max_bytes: Disk budget; least recently used files are evicted past it.
+            suffix: File extension for stored audio.
+        """
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index: OrderedDict[str, int] = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._waiters: dict[asyncio.Future, int] = {}  # callers awaiting each in-flight render
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key(voice: str, text: str, model_id: str) -> str:
+        h = hashlib.sha256()
+        for part in (voice, text, model_id):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def _url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}{self.suffix}"
+
+    def _scan(self):
+        """Rebuilds the index from files already on disk, oldest first."""
+        entries = []
+        for path in self.root.glob(f"*{self.suffix}"):
+            if _KEY_RE.match(path.stem):
+                st = path.stat()
+                entries.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, key: str) -> str | None:
+        """Returns the URL for a cached line and marks it recently used."""
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            # Removed behind our back; forget it so it gets re-rendered.
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+            return None
+        return self._url(key)
+
+    def path_for(self, url: str | None) -> Path | None:
+        """Maps a URL returned by this cache back to its file, if it is still cached."""
+        if not url or not url.startswith(f"{self.url_prefix}/") or not url.endswith(self.suffix):
+            return None
+        key = url[len(self.url_prefix) + 1:-len(self.suffix)]
+        if not _KEY_RE.match(key) or key not in self._index:
+            return None
+        return self._path(key)
+
+    def store(self, key: str, render: Callable[[Path], None]) -> str:
+        """
+        Renders a line into the cache and returns its URL.
+
+        `render` writes the audio to the path it is given. It writes to a
+        temporary name that is swapped in atomically, so readers never see a
+        partial file.
+        """
+        path = self._path(key)
+        tmp = path.with_name(f".{key}.{threading.get_ident()}{self.suffix}")
+        try:
+            render(tmp)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return self._commit(key, path)
+
+    def _commit(self, key: str, path: Path) -> str:
+        size = path.stat().st_size
+        with self._lock:
+            self._total += size - self._index.get(key, 0)
+            self._index[key] = size
+            self._index.move_to_end(key)
+            self._evict()
+        return self._url(key)
+
+    async def astore(self, key: str, arender: Callable[[Path], Awaitable[None]]) -> str:
+        """`store` for a coroutine renderer, e.g. one that calls a TTS service."""
+        path = self._path(key)
+        tmp = path.with_name(f".{key}.{id(asyncio.current_task())}{self.suffix}")
+        try:
+            await arender(tmp)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return self._commit(key, path)
+
+    async def get_or_render(self, key: str, render: Callable[[Path], None], executor=None, arender=None) -> str:
+        """
+        Returns the cached URL for `key`, rendering it on a miss: with the
+        coroutine `arender` if given, otherwise with `render` on `executor`.
+
+        Concurrent misses for the same key share one render. It is cancelled
+        once every caller waiting on it has been cancelled, so an abandoned
+        line stops using the TTS backend.
+        """
+        url = self.lookup(key)
+        if url is not None:
+            return url
+        if key not in self._inflight:
+            if arender is not None:
+                future = asyncio.ensure_future(self.astore(key, arender))
+            else:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(executor, self.store, key, render)
+            self._inflight[key] = future
+            self._waiters[future] = 0
+            future.add_done_callback(lambda _: self._forget(key, future))
+
+        future = self._inflight[key]
+        self._waiters[future] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.done() and self._waiters[future] == 1:
+                future.cancel()  # an executor job only stops if it hasn't started
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if future.done() and not self._waiters[future]:
+                del self._waiters[future]
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not self._waiters.get(future):
+            self._waiters.pop(future, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._index), "bytes": self._total, "max_bytes": self.max_bytes}
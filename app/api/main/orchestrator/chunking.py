@@ -0,0 +1,48 @@
+"""
+Speakable Chunking
+Cuts a stream of LLM tokens into sentences (or long clauses) that can be
+handed to TTS as soon as they are complete.
+"""
+from __future__ import annotations
+import re
+from typing import AsyncIterator
+
+# End of a sentence, including any closing quotes/brackets, followed by space.
+SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s")
+# Softer break points used once a clause is long enough to be worth speaking.
+CLAUSE_END = re.compile(r"[,;:—–]\s?")
+
+# Clauses shorter than this are held back so TTS isn't fed fragments.
+MIN_CLAUSE_CHARS = 40
+
+
+def split_speakable(buffer: str, min_clause_chars: int = MIN_CLAUSE_CHARS) -> tuple[list[str], str]:
+    """
+    Splits complete chunks off the front of `buffer`.
+
+    Returns the finished chunks and the unfinished remainder.
+    """
+    chunks = []
+    while True:
+        m = SENTENCE_END.search(buffer)
+        if m is None and len(buffer) >= min_clause_chars:
+            # No sentence end yet; fall back to the last clause break past the minimum.
+            breaks = [c for c in CLAUSE_END.finditer(buffer) if c.end() >= min_clause_chars]
+            m = breaks[-1] if breaks else None
+        if m is None:
+            return chunks, buffer
+        chunk, buffer = buffer[:m.end()].strip(), buffer[m.end():]
+        if chunk:
+            chunks.append(chunk)
+
+
+async def speakable_chunks(tokens: AsyncIterator[str], min_clause_chars: int = MIN_CLAUSE_CHARS) -> AsyncIterator[str]:
+    """Yields speakable chunks as soon as they are complete in the token stream."""
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        chunks, buffer = split_speakable(buffer, min_clause_chars)
+        for chunk in chunks:
+            yield chunk
+    if buffer.strip():
+        yield buffer.strip()
@@ -1,19 +1,138 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
 import re
+from typing import Mapping
 
 ASK_BROTHER = re.compile(r"\b(brother|bro|hand.*to.*bro|put.*(him|bro).*(on|through)|can i talk to (him|my brother))\b", re.I)
 END_CALL = re.compile(r"\b(end call|hang up|goodbye|bye)\b", re.I)
 CREATE_AGENT = re.compile(r"\b(talk to|speak to|speak with)\s+([A-Z][a-z]+)", re.I)
 
 
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    target: str | None = None       # agent the turn is directed at, if any
+    span: tuple[int, int] | None = None  # where in the text it matched
+    arg: str = ""                   # trailing text, e.g. the vibe for create_agent
+
+
+def _literal(phrase: str) -> str:
+    """Regex for a phrase, anchored at word boundaries where it starts/ends with a word char."""
+    p = re.escape(phrase.lower())
+    if phrase[:1].isalnum():
+        p = r"\b" + p
+    if phrase[-1:].isalnum():
+        p = p + r"\b"
+    return p
+
+
+class IntentEngine:
+    """
+    Every intent pattern, stop word and handoff trigger for a scene compiled
+    into one alternation. A turn costs one lowercase pass and one regex scan,
+    however many characters and triggers the scene has.
+
+    Each alternative is a zero-width lookahead, so the scan tries every
+    position and a lower-priority match early in the text never hides a
+    higher-priority one later; the lowest rank found wins. Handoff triggers
+    only apply to their `from` speaker, so the regex is compiled per
+    foreground speaker (once each) with just the triggers that apply.
+    """
+
+    def __init__(self, trigger_index: Mapping[str, tuple] | None = None, stop_words: tuple = ()):
+        """
+        Args:
+            trigger_index: Handoff triggers by `from` speaker, as
+                `((to, (keyword, ...)), ...)` (a scene template's `trigger_index`).
+            stop_words: Phrases that end the call when said on their own.
+        """
+        self._triggers = trigger_index or {}
+        # (pattern, intent, target) before and after the speaker's triggers; order is priority.
+        self._head: list[tuple[str, str, str | None]] = [(END_CALL.pattern, "end_call", None)]
+        for word in stop_words:
+            # A stop word is a whole utterance or clause ("stop.", "ok, stop"), not any mention of it.
+            self._head.append((rf"(?:^|(?<=[.!?;,]))\s*{_literal(word)}\s*(?=[.!?;,]|$)", "end_call", None))
+        # "talk to <name>" outranks the scene's generic trigger phrases.
+        self._head.append((
+            r"\b(?:talk to|speak to|speak with|hand me (?:over )?to|put me through to)\s+"
+            r"(?:my\s+|the\s+|your\s+)?(?P<agent>[a-z]+)",
+            "create_agent", None,
+        ))
+        self._tail = [
+            (ASK_BROTHER.pattern, "ask_brother", None),
+            (r"\bquiet\b", "lower_bg", None),
+            (r"\b(?:mom|mother|ma|hey)\b", "talk_mother", None),
+        ]
+        # foreground -> (alternatives in rank order, compiled regex)
+        self._compiled: dict[str | None, tuple[list, re.Pattern]] = {}
+
+    def _for(self, foreground: str | None) -> tuple[list, re.Pattern]:
+        compiled = self._compiled.get(foreground)
+        if compiled is None:
+            triggers = [
+                (_literal(keyword), "handoff", to)
+                for to, keywords in self._triggers.get(foreground, ())
+                for keyword in keywords
+            ]
+            alts = self._head + triggers + self._tail
+            regex = re.compile("|".join(f"(?=(?P<g{rank}>{alt[0]}))" for rank, alt in enumerate(alts)))
+            compiled = self._compiled[foreground] = (alts, regex)
+        return compiled
+
+    def match(self, text: str, foreground: str | None = None, agents=()) -> IntentMatch:
+        """
+        Classifies `text` for a scene whose current speaker is `foreground`.
+
+        `agents` are the known agent ids: "talk to <name>" for one of them is a
+        handoff rather than a request to create a new agent.
+        """
+        norm = text.lower()
+        alts, regex = self._for(foreground)
+        best = None
+        for m in regex.finditer(norm):
+            rank = int(m.lastgroup[1:])
+            if best is None or rank < best[0]:
+                best = (rank, m)
+                if rank == 0:
+                    break
+
+        if best is None:
+            return IntentMatch("smalltalk")
+
+        rank, m = best
+        _, intent, target = alts[rank]
+        span = m.span(m.lastgroup)
+        if intent == "create_agent":
+            target = m.group("agent")
+            # Lowercasing keeps offsets for almost all text; take the vibe from the original when it does.
+            source = text if len(text) == len(norm) else norm
+            arg = source[span[1]:].strip()
+            if target in agents:
+                return IntentMatch("handoff", target, span)
+            return IntentMatch("create_agent", target, span, arg)
+        return IntentMatch(intent, target, span)
+
+
+@lru_cache(maxsize=64)
+def _cached_engine(triggers: tuple, stop_words: tuple) -> IntentEngine:
+    return IntentEngine(dict(triggers), stop_words)
+
+
+def engine_for_scene(state) -> IntentEngine:
+    """
+    Returns the engine for a scene's rules, shared by every session of that
+    scene. Scenes from the registry carry one already (`template.intents`).
+    """
+    index: dict[str, list] = {}
+    for t in state.rules.get("handoff_triggers", []):
+        if "from" in t and "to" in t and "when_user_mentions" in t:
+            index.setdefault(t["from"], []).append((t["to"], tuple(t["when_user_mentions"])))
+    return _cached_engine(tuple((k, tuple(v)) for k, v in index.items()), tuple(state.stop_words))
+
+
+_default_engine = IntentEngine()
+
+
 def classify(text: str):
-    if END_CALL.search(text):
-        return "end_call"
-    if ASK_BROTHER.search(text):
-        return "ask_brother"
-    if CREATE_AGENT.search(text):
-        return "create_agent"
-    if "quiet" in text.lower():
-        return "lower_bg"
-    if any(w in text.lower() for w in ("mom", "mother", "ma", "hey")):
-        return "talk_mother"
-    return "smalltalk"
+    return _default_engine.match(text).intent
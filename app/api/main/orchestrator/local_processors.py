@@ -1,6 +1,6 @@
 import asyncio
 # from genai_processors import Processor
-import whisper
+# import whisper  # only the disabled processors below used it; it pulls in torch
 import numpy as np
 import httpx
 from app.api.main.llm.lm_studio import LMStudio
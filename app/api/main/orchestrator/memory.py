@@ -0,0 +1,131 @@
+"""
+Conversation Memory
+The call so far, kept per session in `SceneState.memory`, and rendered as
+chat history for whichever character speaks next. Its size is bounded by
+a token budget: recent turns are kept verbatim, older ones are folded into
+a short summary in the background.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from .state import SceneState
+
+USER = "user"
+# Token budget for verbatim turns, and the target length of the summary.
+MEMORY_TOKENS = int(os.getenv("ETHER_MEMORY_TOKENS", "800"))
+SUMMARY_TOKENS = int(os.getenv("ETHER_SUMMARY_TOKENS", "150"))
+
+# (previous summary, transcript lines to fold in, max tokens) -> new summary
+Summarizer = Callable[[str, list[str], int], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English), without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def transcript_line(turn: dict) -> str:
+    return f"{turn['speaker']}: {turn['text']}"
+
+
+class ConversationMemory:
+    """
+    Rolling transcript of the call, stored in `state.memory` as
+    `{"summary": str, "turns": [{"speaker", "text", "tokens"}]}` (speaker
+    "user" for the caller).
+
+    When the verbatim turns go over `max_tokens`, the oldest are moved out
+    until half the budget is left and summarized off the turn's critical
+    path. Compacting in large steps keeps the rendered history (and the
+    model server's cached prefix) unchanged between compactions.
+    """
+
+    def __init__(
+        self,
+        state: SceneState,
+        summarize: Summarizer | None = None,
+        max_tokens: int = MEMORY_TOKENS,
+        summary_tokens: int = SUMMARY_TOKENS,
+    ):
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.memory = state.memory
+        self.memory.setdefault("summary", "")
+        self.turns: list[dict] = self.memory.setdefault("turns", [])
+        self._tokens = sum(t["tokens"] for t in self.turns)
+        self._pending: list[dict] = []  # moved out of `turns`, not yet summarized
+        self._compaction: asyncio.Task | None = None
+
+    @property
+    def summary(self) -> str:
+        return self.memory["summary"]
+
+    @property
+    def tokens(self) -> int:
+        """Estimated size of the rendered history."""
+        return self._tokens + (estimate_tokens(self.summary) if self.summary else 0)
+
+    def record(self, speaker: str, text: str):
+        if not text:
+            return
+        tokens = estimate_tokens(text)
+        self.turns.append({"speaker": speaker, "text": text, "tokens": tokens})
+        self._tokens += tokens
+        if self._tokens > self.max_tokens:
+            self._compact()
+
+    def _compact(self):
+        keep = self.max_tokens // 2
+        while self.turns and self._tokens > keep:
+            turn = self.turns.pop(0)
+            self._tokens -= turn["tokens"]
+            self._pending.append(turn)
+        if self.summarize is None:
+            self._pending.clear()
+        elif self._compaction is None or self._compaction.done():
+            self._compaction = asyncio.create_task(self._summarize_pending())
+
+    async def _summarize_pending(self):
+        while self._pending:
+            # At most a budget's worth per request, so summarizing stays cheap too.
+            size = n = 0
+            while n < len(self._pending) and size < self.max_tokens:
+                size += self._pending[n]["tokens"]
+                n += 1
+            batch, self._pending = self._pending[:n], self._pending[n:]
+            try:
+                summary = await self.summarize(
+                    self.summary, [transcript_line(t) for t in batch], self.summary_tokens
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The turns are lost from memory, but the call goes on.
+                print(f"ERROR: Could not summarize the conversation. Details: {e}")
+                continue
+            # A summary that ran long is cut so the prompt stays bounded.
+            self.memory["summary"] = summary.strip()[: self.summary_tokens * 4]
+
+    def messages_for(self, character_id: str) -> list[dict]:
+        """
+        The transcript as chat messages from `character_id`'s point of view:
+        its own lines are the assistant's, everyone else's are user input.
+        """
+        messages = []
+        if self.summary:
+            messages.append({"role": "user", "content": f"[earlier in the call] {self.summary}"})
+        for turn in self.turns:
+            if turn["speaker"] == character_id:
+                messages.append({"role": "assistant", "content": turn["text"]})
+            elif turn["speaker"] == USER:
+                messages.append({"role": "user", "content": turn["text"]})
+            else:
+                messages.append({"role": "user", "content": f"[{turn['speaker']}] {turn['text']}"})
+        return messages
+
+    def close(self):
+        if self._compaction is not None:
+            self._compaction.cancel()
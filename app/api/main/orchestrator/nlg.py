@@ -1,10 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
 from pathlib import Path
-import random
-import torchaudio
-import uuid
+import time
+from typing import AsyncIterator, Mapping
 
-from app.api.main.llm import llm_connector
+from app.api.main.audio import SUFFIXES, encode_opus, opus_available
+from app.api.main.llm import get_llm
+from app.api.main.telemetry import observe, span
+from .asides import MAX_ASIDES_PER_TURN, AsideSampler, AsideTable
+from .audio_cache import AudioCache
+from .personas import PersonaRegistry
 from .safety import sanitize
 from .state import SceneState
 
@@ -12,6 +19,28 @@ from .state import SceneState
 AUDIO_DIR = Path("app/frontend/assets/gen-audio")
 AUDIO_DIR.mkdir(exist_ok=True)
 
+# TTS synthesis is CPU-bound and blocking, so it runs on a small dedicated
+# pool instead of the event loop (or the default executor, which is shared).
+TTS_MAX_WORKERS = int(os.getenv("ETHER_TTS_WORKERS", "2"))
+_tts_executor = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+
+# Lines are stored pre-encoded: Ogg/Opus (about a fifteenth of the size of
+# WAV) when ffmpeg is available, WAV otherwise. ETHER_AUDIO_FORMAT forces one.
+AUDIO_FORMAT = os.getenv("ETHER_AUDIO_FORMAT") or ("opus" if opus_available() else "wav")
+if AUDIO_FORMAT not in SUFFIXES or (AUDIO_FORMAT == "opus" and not opus_available()):
+    print(f"WARNING: Audio format '{AUDIO_FORMAT}' is not available; storing lines as WAV.")
+    AUDIO_FORMAT = "wav"
+
+# Synthesized lines are cached by (voice, text, model), so repeated lines are
+# never synthesized twice and the directory stays within its disk budget.
+AUDIO_CACHE_MB = int(os.getenv("ETHER_AUDIO_CACHE_MB", "512"))
+audio_cache = AudioCache(
+    AUDIO_DIR,
+    "assets/gen-audio",
+    max_bytes=AUDIO_CACHE_MB * 1024 * 1024,
+    suffix=SUFFIXES[AUDIO_FORMAT],
+)
+
 def _build_system_prompt(persona: dict) -> str:
     """
     Constructs a detailed system prompt from a character's persona dictionary
@@ -25,66 +54,210 @@ def _build_system_prompt(persona: dict) -> str:
         f"You are a character in a simulated family group call. "
         f"Your persona is: {persona.get('archetype', 'a friendly person')}.\n"
         f"Your speaking style is {style.get('pace', 'medium')} paced and {style.get('politeness', 'casually')} polite.\n"
-        f"You are talking to {relationship.get('to_user', 'someone you know well')}, who you call {relationship.get('nicknames', ['pal'])[0]}.\n"
+        f"You are talking to {relationship.get('to_user', 'someone you know well')}, who you call {(relationship.get('nicknames') or ['pal'])[0]}.\n"
         f"A few things you might say are: \"{', '.join(persona.get('smalltalk', []))}\".\n\n"
         f"**RULES:**\n"
-        f"1. Respond naturally to the user's last message: \"{{user_text}}\".\n"
+        f"1. Respond naturally to the user's last message.\n"
         f"2. Keep your entire response to one or two short, speakable sentences.\n"
         f"3. DO NOT use asterisks, emojis, or formatting.\n"
-        f"4. Stay strictly in character. Do not reveal you are an AI."
+        f"4. Stay strictly in character. Do not reveal you are an AI.\n"
+        f"5. Lines starting with a name in brackets, like [uncle], were said by others on the call."
     )
     return prompt
 
-def generate_character_line(character_id: str, user_text: str) -> str:
-    """
-    Generates a dynamic, in-character line using the configured LLM.
+# Personas are parsed and their prompts compiled once, then served from memory.
+persona_registry = PersonaRegistry(Path("agents"), compile_prompt=_build_system_prompt)
+
+def _character_prompt(character_id: str) -> tuple[str | None, str | None]:
     """
-    persona_path = Path(f"agents/{character_id}.json")
-    if not persona_path.exists():
-        print(f"WARNING: No persona file found for character '{character_id}'.")
-        return "Uh, who is this?"
+    Builds the system prompt for a character.
 
+    Returns `(system_prompt, None)` on success, or `(None, fallback_line)` when
+    the persona can't be loaded and a canned line should be spoken instead.
+    """
     try:
-        with persona_path.open("r", encoding="utf-8") as f:
-            persona = json.load(f)
+        with span("persona"):
+            persona = persona_registry.get(character_id)
     except (json.JSONDecodeError, IOError) as e:
         print(f"ERROR: Could not read or parse persona for '{character_id}'. Details: {e}")
-        return "I'm not feeling like myself right now."
+        return None, "I'm not feeling like myself right now."
+
+    if persona is None:
+        print(f"WARNING: No persona file found for character '{character_id}'.")
+        return None, "Uh, who is this?"
+
+    return persona.system_prompt, None
+
+async def generate_character_line(
+    character_id: str,
+    user_text: str,
+    history: list[dict] | None = None,
+    cache_key: str | None = None,
+) -> str:
+    """
+    Generates a dynamic, in-character line using the configured LLM.
+
+    The persona's system prompt and `history` form a prefix shared with the
+    character's next turn; only `user_text` is new.
+    """
+    system_prompt, fallback = _character_prompt(character_id)
+    if fallback is not None:
+        return fallback
 
-    # Build the prompt and get a dynamic response from the LLM.
-    system_prompt = _build_system_prompt(persona).format(user_text=user_text)
+    with span("llm"):
+        generated_line = await get_llm().agenerate_response(
+            system_prompt=system_prompt,
+            user_prompt=user_text,
+            history=history,
+            cache_key=cache_key,
+        )
+    return generated_line
 
-    generated_line = llm_connector.generate_response(
+async def stream_character_line(
+    character_id: str,
+    user_text: str,
+    history: list[dict] | None = None,
+    cache_key: str | None = None,
+) -> AsyncIterator[str]:
+    """
+    Streams an in-character line from the configured LLM as text deltas.
+
+    Records time to the first delta as the `llm_first_token` span; the `llm`
+    span runs to the last one, so it includes any time the consumer held
+    the stream back.
+    """
+    system_prompt, fallback = _character_prompt(character_id)
+    if fallback is not None:
+        yield fallback
+        return
+
+    start = time.perf_counter()
+    first = True
+    with span("llm"):
+        async for delta in get_llm().astream_response(
+            system_prompt=system_prompt,
+            user_prompt=user_text,
+            history=history,
+            cache_key=cache_key,
+        ):
+            if first:
+                observe("llm_first_token", time.perf_counter() - start)
+                first = False
+            yield delta
+
+async def summarize_call(summary: str, lines: list[str], max_tokens: int) -> str:
+    """Folds transcript lines into the running summary of the call."""
+    system_prompt = (
+        "You keep notes on a phone call between a caller and their family. "
+        f"Rewrite the notes to include the new lines, in at most {max_tokens * 3 // 4} words. "
+        "Keep names, plans, questions still open and anything the caller shared. "
+        "Reply with the notes only."
+    )
+    transcript = "\n".join(lines)
+    return await get_llm().agenerate_response(
         system_prompt=system_prompt,
-        user_prompt=user_text  # Pass user_text again for models that use it separately
+        user_prompt=f"Notes so far:\n{summary or '(none)'}\n\nNew lines:\n{transcript}",
     )
-    return generated_line
 
-def aside_lines(state: SceneState) -> list[dict]:
-    """Pulls a random subset of background chatter from the current scene state."""
-    if not hasattr(state, 'background_asides') or not state.background_asides:
-        return []
 
-    max_asides = min(len(state.background_asides), 2)
-    num_to_play = random.randint(0, max_asides)
+def aside_lines(state: SceneState, max_asides: int = MAX_ASIDES_PER_TURN, tts_model=None) -> list[dict]:
+    """
+    Picks this turn's background chatter from the scene's precomputed aside
+    table. Asides that are in the audio cache (see warmup) carry its URL as
+    `audio`; the others stay text, since chatter never waits on synthesis.
+    """
+    template = getattr(state, "template", None)
+    table = template.aside_table if template is not None else AsideTable.from_scene(
+        getattr(state, "background_asides", None) or [], state.characters
+    )
+    if state.asides is None:
+        state.asides = AsideSampler()
+    picked = []
+    for a in state.asides.pick(table, state.intensity, max_asides):
+        entry = {"speaker": a.speaker, "line": a.line, "proximity": a.proximity}
+        audio = cached_line(tts_model, sanitize(a.line), voice_for(state, a.speaker))
+        if audio:
+            entry["audio"] = audio
+        picked.append(entry)
+    return picked
+
+
+def tts_model_id(tts_model) -> str:
+    """Identifies a TTS model for cache keys, so swapping models never serves stale audio."""
+    return getattr(tts_model, "model_id", None) or f"{type(tts_model).__name__}@{getattr(tts_model, 'sr', 0)}"
+
+
+def voice_map(state: SceneState) -> Mapping[str, str]:
+    """The scene's speaker -> voice map, precompiled when the scene came from the registry."""
+    template = getattr(state, "template", None)
+    return template.voice_map if template is not None else state.tts.get("voice_map", {})
+
+
+def voice_for(state: SceneState, speaker: str) -> str:
+    return voice_map(state).get(speaker, "default")
 
-    if num_to_play == 0:
-        return []
 
-    all_possible_lines = []
-    for aside_group in state.background_asides:
-        speaker = aside_group.get("speaker")
-        if speaker:
-            for line in aside_group.get("lines", []):
-                all_possible_lines.append({"speaker": speaker, "line": line})
+def _synthesize_to_file(tts_model, text: str, filepath: Path, voice: str = "default") -> None:
+    """Runs TTS for one line and writes it in the cache's format."""
+    render = getattr(tts_model, "render", None)
+    if render is not None:
+        # Backends such as RemoteTTS produce encoded audio themselves.
+        render(text, voice, filepath)
+        return
+    with span("tts_synthesis"):
+        wav = tts_model.generate(text)
+    with span("tts_write"):
+        if AUDIO_FORMAT == "opus":
+            pcm = (wav.clamp(-1, 1) * 32767).short().cpu().numpy().tobytes()
+            Path(filepath).write_bytes(encode_opus(pcm, tts_model.sr))
+            return
+        import torchaudio  # only in-process models need it; it pulls in torch
+        torchaudio.save(filepath, wav, tts_model.sr)
 
-    if not all_possible_lines:
-        return []
 
-    return random.sample(all_possible_lines, min(num_to_play, len(all_possible_lines)))
+def cached_line(tts_model, sanitized_line: str, voice: str = "default") -> str | None:
+    """Returns the URL of the line's audio if it is already cached; never synthesizes."""
+    if not tts_model:
+        return None
+    return audio_cache.lookup(audio_cache.key(voice, sanitized_line, tts_model_id(tts_model)))
 
 
-def pack_plan(
+async def voice_line(tts_model, sanitized_line: str, voice: str = "default") -> str:
+    """
+    Returns the frontend-relative path of the line's audio, synthesizing it off
+    the event loop on a cache miss. Falls back to the text itself.
+    """
+    if not tts_model:
+        return sanitized_line
+    arender = getattr(tts_model, "arender", None)
+    try:
+        key = audio_cache.key(voice, sanitized_line, tts_model_id(tts_model))
+        with span("tts"):  # cache hits included
+            return await audio_cache.get_or_render(
+                key,
+                lambda path: _synthesize_to_file(tts_model, sanitized_line, path, voice),
+                executor=_tts_executor,
+                # Remote backends render on the event loop, so cancelling a turn
+                # also cancels its request to the TTS service.
+                arender=(lambda path: arender(sanitized_line, voice, path)) if arender else None,
+            )
+    except Exception as e:
+        print(f"ERROR: TTS generation failed: {e}")
+        return sanitized_line
+
+
+async def pack_chunk(speaker: str, text: str, index: int, tts_model=None, voice: str = "default") -> dict:
+    """
+    Sanitizes and voices one streamed chunk of a foreground line, in the same
+    shape as a plan's `foreground` entry plus its position in the line.
+    """
+    with span("sanitize"):
+        sanitized = sanitize(text)
+    line_content = await voice_line(tts_model, sanitized, voice)
+    return {"speaker": speaker, "line": line_content, "transcript": sanitized, "index": index}
+
+
+async def pack_plan(
     fore_speaker: str,
     line: str,
     state: SceneState,
@@ -95,26 +268,34 @@ def pack_plan(
     Packages the generated line and other data into the final JSON plan
     that the frontend will execute. This includes generating the TTS audio.
     """
-    sanitized_line = sanitize(line)
-
-    if tts_model:
-        try:
-            wav = tts_model.generate(sanitized_line)
-            filename = f"{uuid.uuid4()}.wav"
-            filepath = AUDIO_DIR / filename
-            torchaudio.save(filepath, wav, tts_model.sr)
-            line_content = f"assets/gen-audio/{filename}"
-        except Exception as e:
-            print(f"ERROR: TTS generation failed: {e}")
-            line_content = sanitized_line
-    else:
-        line_content = sanitized_line
+    with span("sanitize"):
+        sanitized_line = sanitize(line)
+    line_content = await voice_line(tts_model, sanitized_line, voice_for(state, fore_speaker))
+    foreground = {"speaker": fore_speaker, "line": line_content, "transcript": sanitized_line}
+    return _plan(foreground, state, handoff_to, tts_model)
+
+
+def pack_stream_plan(
+    fore_speaker: str,
+    transcript: str,
+    state: SceneState,
+    handoff_to: str | None = None,
+    tts_model=None,
+):
+    """
+    Closes out a streamed turn. The foreground audio already went out as
+    `plan_chunk` messages, so the foreground carries no `line` to replay.
+    """
+    foreground = {"speaker": fore_speaker, "transcript": transcript, "streamed": True}
+    return _plan(foreground, state, handoff_to, tts_model)
+
 
+def _plan(foreground: dict, state: SceneState, handoff_to: str | None, tts_model=None) -> dict:
     duck_db = getattr(state, 'ducking_db', -14)
     overlap_ms = getattr(state, 'overlap', {}).get('max_ms', 350)
 
     return {
-        "foreground": {"speaker": fore_speaker, "line": line_content, "transcript": sanitized_line},
-        "background": aside_lines(state),
+        "foreground": foreground,
+        "background": aside_lines(state, tts_model=tts_model),
         "controls": {"ducking_db": duck_db, "overlap_ms": overlap_ms, "handoff_to": handoff_to or "none"}
     }
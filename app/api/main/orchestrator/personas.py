@@ -0,0 +1,100 @@
+"""
+Persona Registry
+Keeps every `agents/*.json` persona in memory with its system prompt
+precompiled, reloading an entry only when its file changes.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import time
+from typing import Callable
+
+@dataclass(frozen=True)
+class CompiledPersona:
+    id: str
+    data: dict
+    mtime: float
+    # Identical for every turn, so it stays a cacheable prompt prefix.
+    system_prompt: str
+
+
+class PersonaRegistry:
+    """
+    In-memory persona cache.
+
+    A persona's file is stat'ed at most once per `check_interval_s`; it is
+    only re-read and recompiled when its mtime has moved.
+    """
+
+    def __init__(
+        self,
+        agents_dir: Path,
+        compile_prompt: Callable[[dict], str],
+        check_interval_s: float = 1.0,
+    ):
+        self.agents_dir = Path(agents_dir)
+        self.compile_prompt = compile_prompt
+        self.check_interval_s = check_interval_s
+        self._entries: dict[str, CompiledPersona] = {}
+        self._checked_at: dict[str, float] = {}
+
+    def _path(self, persona_id: str) -> Path:
+        return self.agents_dir / f"{persona_id}.json"
+
+    def _compile(self, persona_id: str, data: dict, mtime: float) -> CompiledPersona:
+        entry = CompiledPersona(persona_id, data, mtime, self.compile_prompt(data))
+        self._entries[persona_id] = entry
+        self._checked_at[persona_id] = time.monotonic()
+        return entry
+
+    def _load(self, persona_id: str, mtime: float) -> CompiledPersona:
+        with self._path(persona_id).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return self._compile(persona_id, data, mtime)
+
+    def load_all(self) -> int:
+        """Loads every persona in the agents directory; returns how many loaded."""
+        for path in sorted(self.agents_dir.glob("*.json")):
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"ERROR: Could not read or parse persona '{path.name}'. Details: {e}")
+                continue
+            # Other JSON in agents/ (e.g. utterance samples) has no persona id.
+            if isinstance(data, dict) and "id" in data:
+                self._compile(path.stem, data, path.stat().st_mtime)
+        return len(self._entries)
+
+    def get(self, persona_id: str) -> CompiledPersona | None:
+        """
+        Returns the persona, or None if it has no file.
+
+        Raises json.JSONDecodeError/IOError if a new or changed file can't be read.
+        """
+        entry = self._entries.get(persona_id)
+        now = time.monotonic()
+        if entry and now - self._checked_at.get(persona_id, 0.0) < self.check_interval_s:
+            return entry
+
+        try:
+            mtime = os.stat(self._path(persona_id)).st_mtime
+        except FileNotFoundError:
+            self._entries.pop(persona_id, None)
+            return None
+
+        self._checked_at[persona_id] = now
+        if entry and entry.mtime == mtime:
+            return entry
+        return self._load(persona_id, mtime)
+
+    def __contains__(self, persona_id: str) -> bool:
+        return persona_id in self._entries or self._path(persona_id).exists()
+
+    def put(self, persona_id: str, data: dict) -> CompiledPersona:
+        """Registers a persona that was just written to disk."""
+        path = self._path(persona_id)
+        mtime = path.stat().st_mtime if path.exists() else time.time()
+        return self._compile(persona_id, data, mtime)
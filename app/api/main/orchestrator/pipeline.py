@@ -0,0 +1,295 @@
+"""
+Pipeline
+A small runtime for a call's streaming stages (speech recognition, the
+director, sending to the client). Each stage has one worker reading from a
+bounded queue, so when a stage falls behind, work before it waits, or is
+dropped or merged where that is safe, instead of piling up in memory.
+
+Overflow policies, applied when a stage's queue is full:
+- BLOCK: the producer waits for room.
+- DROP_OLDEST: the oldest item the stage marks droppable (e.g. a partial
+  transcript) makes room; if there is none, the producer waits.
+- COALESCE: an item replaces the queued item with the same key (e.g. a
+  newer partial replaces an older one), whether or not the queue is full;
+  items without a key wait for room.
+"""
+from __future__ import annotations
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.api.main.telemetry import STAGE_ITEMS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+Emit = Callable[[Any], Awaitable[None]]
+Handler = Callable[[Any, Emit], Awaitable[None]]
+
+
+class PipelineClosed(RuntimeError):
+    """Raised to producers and consumers of a queue that has been closed."""
+
+
+@dataclass
+class StageStats:
+    """Counters for one stage. Wait is time spent queued; service is time in the handler."""
+    processed: int = 0
+    errors: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+    wait_s: float = 0.0
+    max_wait_s: float = 0.0
+    service_s: float = 0.0
+    max_service_s: float = 0.0
+
+    def snapshot(self, depth: int) -> dict:
+        n = max(self.processed, 1)
+        return {
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "avg_wait_ms": round(1000 * self.wait_s / n, 2),
+            "max_wait_ms": round(1000 * self.max_wait_s, 2),
+            "avg_service_ms": round(1000 * self.service_s / n, 2),
+            "max_service_ms": round(1000 * self.max_service_s, 2),
+        }
+
+
+class StageQueue:
+    def __init__(
+        self,
+        maxsize: int,
+        overflow: str = BLOCK,
+        droppable: Callable[[Any], bool] | None = None,
+        key: Callable[[Any], Hashable | None] | None = None,
+        stats: StageStats | None = None,
+        name: str = "queue",
+    ):
+        """
+        Args:
+            maxsize: Items held before the overflow policy applies.
+            overflow: BLOCK, DROP_OLDEST or COALESCE.
+            droppable: For DROP_OLDEST, which items may be dropped (default: any).
+            key: For COALESCE, an item's merge key; None means it never merges.
+            name: Label for exported metrics; the stage's name in a pipeline.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.droppable = droppable or (lambda item: True)
+        self.key = key or (lambda item: None)
+        self.stats = stats or StageStats()
+        self.name = name
+        self._items: deque[list] = deque()  # [enqueued_at, item], oldest first
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _place(self, item) -> bool:
+        """Adds `item` if the policy allows it now; False means the producer must wait."""
+        if self.overflow == COALESCE and (k := self.key(item)) is not None:
+            for entry in self._items:
+                if self.key(entry[1]) == k:
+                    entry[1] = item  # keeps the older item's place in line
+                    self.stats.coalesced += 1
+                    STAGE_ITEMS.labels(self.name, "coalesced").inc()
+                    return True
+        if len(self._items) >= self.maxsize:
+            if self.overflow != DROP_OLDEST or not self._drop_oldest():
+                return False
+        self._items.append([time.monotonic(), item])
+        self.stats.max_depth = max(self.stats.max_depth, len(self._items))
+        self._not_empty.set()
+        return True
+
+    def _drop_oldest(self) -> bool:
+        for entry in self._items:
+            if self.droppable(entry[1]):
+                self._items.remove(entry)
+                self.stats.dropped += 1
+                STAGE_ITEMS.labels(self.name, "dropped").inc()
+                return True
+        return False
+
+    async def put(self, item):
+        while True:
+            if self._closed:
+                raise PipelineClosed("queue is closed")
+            if self._place(item):
+                return
+            self._not_full.clear()
+            await self._not_full.wait()
+
+    def offer(self, item) -> bool:
+        """Adds `item` without waiting. If the policy would make the producer wait, drops it and returns False."""
+        if self._closed:
+            raise PipelineClosed("queue is closed")
+        if self._place(item):
+            return True
+        self.stats.dropped += 1
+        STAGE_ITEMS.labels(self.name, "dropped").inc()
+        return False
+
+    async def get(self) -> tuple[float, Any]:
+        """Returns (enqueue time, item). Once closed, the remaining items are still handed out."""
+        while not self._items:
+            if self._closed:
+                raise PipelineClosed("queue is closed")
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        entry = self._items.popleft()
+        self._not_full.set()
+        return entry[0], entry[1]
+
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        """Removes queued items matching `predicate`, e.g. replies the caller talked over."""
+        kept = [entry for entry in self._items if not predicate(entry[1])]
+        removed = len(self._items) - len(kept)
+        if removed:
+            self._items = deque(kept)
+            self._not_full.set()
+        return removed
+
+    def close(self, drain: bool = True):
+        """Stops accepting items; with `drain=False` queued ones are dropped too."""
+        self._closed = True
+        if not drain:
+            self._items.clear()
+        self._not_empty.set()
+        self._not_full.set()
+
+
+class Stage:
+    def __init__(self, name: str, handler: Handler, queue: StageQueue):
+        self.name = name
+        self.handler = handler
+        self.queue = queue
+        self.task: asyncio.Task | None = None
+
+    @property
+    def stats(self) -> StageStats:
+        return self.queue.stats
+
+    async def _run(self, emit: Emit):
+        stats = self.stats
+        while True:
+            try:
+                enqueued_at, item = await self.queue.get()
+            except PipelineClosed:
+                return
+            started = time.monotonic()
+            waited = started - enqueued_at
+            stats.wait_s += waited
+            stats.max_wait_s = max(stats.max_wait_s, waited)
+            STAGE_SECONDS.labels(self.name, "wait").observe(waited)
+            outcome = "processed"
+            try:
+                await self.handler(item, emit)
+            except PipelineClosed:
+                return  # the next stage has shut down
+            except Exception as e:
+                stats.errors += 1
+                outcome = "error"
+                logger.error(f"Pipeline stage '{self.name}' failed on an item: {e}", exc_info=True)
+            served = time.monotonic() - started
+            stats.processed += 1
+            stats.service_s += served
+            stats.max_service_s = max(stats.max_service_s, served)
+            STAGE_SECONDS.labels(self.name, "service").observe(served)
+            STAGE_ITEMS.labels(self.name, outcome).inc()
+
+
+async def _no_output(item):
+    raise RuntimeError("the last stage of a pipeline has nowhere to emit to")
+
+
+class Pipeline:
+    """
+    Stages run in the order they were added; a handler's `emit` puts into
+    the next stage's queue, so it waits (or drops, or merges) according to
+    that stage's policy. Items can also be put straight into a named stage.
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages: dict[str, Stage] = {}
+
+    def add(
+        self,
+        name: str,
+        handler: Handler,
+        maxsize: int,
+        overflow: str = BLOCK,
+        droppable: Callable[[Any], bool] | None = None,
+        key: Callable[[Any], Hashable | None] | None = None,
+    ) -> "Pipeline":
+        if name in self.stages:
+            raise ValueError(f"stage {name!r} already exists")
+        queue = StageQueue(maxsize, overflow, droppable=droppable, key=key, name=name)
+        self.stages[name] = Stage(name, handler, queue)
+        return self
+
+    def queue(self, stage: str) -> StageQueue:
+        return self.stages[stage].queue
+
+    def _first(self) -> Stage:
+        return next(iter(self.stages.values()))
+
+    def start(self) -> "Pipeline":
+        stages = list(self.stages.values())
+        for stage, following in zip(stages, stages[1:] + [None]):
+            emit = following.queue.put if following is not None else _no_output
+            stage.task = asyncio.create_task(stage._run(emit), name=f"{self.name}:{stage.name}")
+        return self
+
+    async def put(self, item, stage: str | None = None):
+        queue = self.queue(stage) if stage else self._first().queue
+        await queue.put(item)
+
+    def offer(self, item, stage: str | None = None) -> bool:
+        queue = self.queue(stage) if stage else self._first().queue
+        return queue.offer(item)
+
+    async def stop(self, drain: bool = False, timeout_s: float = 2.0):
+        """
+        Shuts the stages down front to back. With `drain`, each stage first
+        finishes what is queued (within `timeout_s` overall); otherwise
+        queued items are dropped and workers cancelled.
+        """
+        deadline = time.monotonic() + timeout_s
+        for stage in self.stages.values():
+            stage.queue.close(drain=drain)
+            if stage.task is None:
+                continue
+            if drain:
+                try:
+                    await asyncio.wait_for(asyncio.shield(stage.task), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+            stage.task.cancel()
+            await asyncio.gather(stage.task, return_exceptions=True)
+
+    def stats(self) -> dict[str, dict]:
+        return {name: stage.stats.snapshot(len(stage.queue)) for name, stage in self.stages.items()}
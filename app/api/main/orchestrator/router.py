@@ -1,15 +1,64 @@
 from .state import SceneState
 from . import intents
-from .nlg import generate_character_line, pack_plan
+from .nlg import (
+    generate_character_line,
+    pack_chunk,
+    pack_plan,
+    pack_stream_plan,
+    persona_registry,
+    stream_character_line,
+    summarize_call,
+    voice_for,
+)
+from .chunking import speakable_chunks
+from .memory import USER, ConversationMemory
 from . import agent_builder
+from app.api.main.telemetry import span
+import asyncio
+from dataclasses import dataclass
 import json
+import logging
 from pathlib import Path
+import random
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Turn:
+    """
+    What a turn resolved to: either a finished `plan`, or a `speaker` who
+    voices a fixed `line` or an LLM reply to `prompt`.
+    """
+    speaker: str | None = None
+    prompt: str | None = None
+    line: str | None = None
+    handoff_to: str | None = None
+    plan: dict | None = None
+
+
+# Sentences voiced ahead of what the client has taken. A slow client holds
+# back TTS, and through it the LLM stream, instead of letting audio pile up.
+MAX_CHUNKS_AHEAD = 3
+
+ENTRANCE_PROMPT = "{source} just handed you the phone. Greet the caller as you pick up."
+DEFAULT_ENTRANCE = "Hey! I'm here, I'm here."
 
 
 class Director:
-    def __init__(self, state: SceneState, tts_model_getter=None):
+    def __init__(self, state: SceneState, tts_model_getter=None, session_id: str | None = None):
         self.state = state
         self.tts_model_getter = tts_model_getter
+        self.session_id = session_id
+        # Older turns are summarized in the background to keep prompts a flat size.
+        self.memory = ConversationMemory(state, summarize=summarize_call)
+        # Entrance of the incoming speaker, generated while the handoff line plays.
+        self._entrance: asyncio.Task | None = None
+        self._followup: asyncio.Task | None = None
+        # Scenes loaded through the registry carry a precompiled engine.
+        template = state.template
+        self.intents = template.intents if template is not None else intents.engine_for_scene(state)
 
     def _create_agent(self, agent_id: str, vibe: str):
         """Creates a new agent and adds it to the scene."""
@@ -21,92 +70,197 @@ class Director:
         persona_path = agents_dir / f"{agent_id}.json"
         with persona_path.open("w", encoding="utf-8") as f:
             json.dump(persona, f, ensure_ascii=False, indent=2)
+        persona_registry.put(agent_id, persona)
 
         # Add the agent to the scene
         if "background" not in self.state.characters:
             self.state.characters["background"] = []
         self.state.characters["background"].append(agent_id)
 
-    def _find_handoff_target(self, user_text: str) -> str | None:
-        """Checks if the user's text triggers a handoff defined in the scene."""
-        s = self.state
-        if not hasattr(s, 'handoff_triggers') or not isinstance(s.handoff_triggers, list):
-            return None
-
-        for trigger in s.handoff_triggers:
-            if "from" in trigger and "to" in trigger and "when_user_mentions" in trigger:
-                if s.foreground == trigger["from"] and any(
-                    keyword.lower() in user_text.lower() for keyword in trigger["when_user_mentions"]
-                ):
-                    return trigger["to"]
-        return None
+    def _agents(self) -> set[str]:
+        return {pid for group in self.state.characters.values() for pid in group}
 
-    def step(self, user_text: str):
+    async def _route(self, user_text: str) -> Turn:
+        """Resolves the intent for a turn and applies its stage changes."""
         s = self.state
         s.last_user_text = user_text or ""
+        # The caller spoke again, so a pending entrance would answer a stale turn.
+        self.interrupt()
 
-        intent = intents.classify(user_text)
-        if intent == "end_call":
-            return {"controls": {"end_call": True}}
-
-        if intent == "create_agent":
-            match = intents.CREATE_AGENT.search(user_text)
-            if match:
-                # Extract agent name and vibe
-                agent_id = match.group(2).lower()
-                vibe = user_text[match.end(0) :].strip()
-
-                # Check if agent exists
-                persona_path = Path(f"agents/{agent_id}.json")
-                if not persona_path.exists():
-                    self._create_agent(agent_id, vibe)
-
-                # Handoff to the new or existing agent
-                s.stage = "Handoff"
-                handoff_prompt = f"The user wants to talk to {agent_id}. Let them know you're getting them."
-                line = generate_character_line(s.foreground, handoff_prompt)
-
-                current_speaker = s.foreground
-                s.foreground = agent_id
-
-                tts_model = self.tts_model_getter() if self.tts_model_getter else None
-                return pack_plan(
-                    current_speaker,
-                    line,
-                    state=s,
-                    handoff_to=agent_id,
-                    tts_model=tts_model,
-                )
-
-        handoff_target = self._find_handoff_target(user_text)
-        if handoff_target and s.foreground != handoff_target:
-            s.stage = "Handoff"
-            handoff_prompt = f"The user wants to talk to {handoff_target}. Let them know you're getting them."
-            line = generate_character_line(s.foreground, handoff_prompt)
-
-            current_speaker = s.foreground
-            s.foreground = handoff_target
-
-            tts_model = self.tts_model_getter() if self.tts_model_getter else None
-            return pack_plan(
-                current_speaker,
-                line,
-                state=s,
-                handoff_to=handoff_target,
-                tts_model=tts_model
-            )
+        with span("intent"):
+            match = self.intents.match(user_text, s.foreground, self._agents())
+        if match.intent == "end_call":
+            return Turn(plan={"controls": {"end_call": True}})
+
+        if match.intent == "create_agent":
+            agent_id, vibe = match.target, match.arg.strip(" ,.;:-")
+            if agent_id not in persona_registry:
+                # Persona generation makes a blocking LLM call and writes to disk.
+                await asyncio.to_thread(self._create_agent, agent_id, vibe)
+            # Handoff to the new or existing agent
+            return self._handoff(agent_id)
+
+        if match.intent == "handoff" and s.foreground != match.target:
+            return self._handoff(match.target)
 
         if s.stage in ["Greeting", "Handoff", "ForegroundTalk"]:
             s.stage = "ForegroundTalk"
-            line = generate_character_line(s.foreground, user_text)
-            tts_model = self.tts_model_getter() if self.tts_model_getter else None
-            return pack_plan(s.foreground, line, state=s, tts_model=tts_model)
+            return Turn(speaker=s.foreground, prompt=user_text)
 
         # Fallback for any unexpected state.
-        tts_model = self.tts_model_getter() if self.tts_model_getter else None
-        return pack_plan(
-            s.foreground,
-            "We’re here! Can you hear us?",
-            state=s,
-            tts_model=tts_model
-        )
+        return Turn(speaker=s.foreground, line="We’re here! Can you hear us?")
+
+    def _handoff(self, target: str) -> Turn:
+        s = self.state
+        s.stage = "Handoff"
+        current_speaker = s.foreground
+        s.foreground = target
+        self._entrance = asyncio.create_task(self._render_entrance(target, current_speaker))
+        # A persona's own handoff line is pre-rendered, so it plays at once.
+        line = self._stock_line(current_speaker, "handoff_lines")
+        if line is not None:
+            return Turn(speaker=current_speaker, line=line, handoff_to=target)
+        handoff_prompt = f"The user wants to talk to {target}. Let them know you're getting them."
+        return Turn(speaker=current_speaker, prompt=handoff_prompt, handoff_to=target)
+
+    def _tts_model(self):
+        return self.tts_model_getter() if self.tts_model_getter else None
+
+    def _context(self, speaker: str) -> dict:
+        """
+        LLM arguments that let the model server reuse the speaker's cached
+        prompt: the call so far, and a key that keeps the conversation on one slot.
+        """
+        return {
+            "history": self.memory.messages_for(speaker),
+            "cache_key": f"{self.session_id}:{speaker}" if self.session_id else None,
+        }
+
+    async def _render_entrance(self, target: str, source: str) -> dict:
+        line = await generate_character_line(target, ENTRANCE_PROMPT.format(source=source), **self._context(target))
+        return await pack_plan(target, line, state=self.state, tts_model=self._tts_model())
+
+    def _stock_line(self, speaker: str, field: str) -> str | None:
+        """A random line from one of the speaker's persona fields (see warmup), if it has any."""
+        persona = persona_registry.get(speaker)
+        lines = persona.data.get(field) if persona else None
+        if not lines:
+            return None
+        rng = self.state.asides.rng if self.state.asides is not None else random
+        return rng.choice(lines)
+
+    async def _stock_entrance(self, target: str) -> dict:
+        """A canned entrance from the persona; usually already in the audio cache."""
+        line = self._stock_line(target, "entrances") or DEFAULT_ENTRANCE
+        return await pack_plan(target, line, state=self.state, tts_model=self._tts_model())
+
+    async def _deliver_entrance(self, target: str, entrance: asyncio.Task) -> dict:
+        """
+        Waits out the scene's handoff window, counted from when the handoff
+        line went out, and returns the entrance plan. If generation hasn't
+        finished by `handoff_max_s` it is dropped for a stock entrance.
+        """
+        timing = self.state.timing
+        min_s = float(timing.get("handoff_min_s", 0))
+        max_s = max(float(timing.get("handoff_max_s", min_s)), min_s)
+        loop = asyncio.get_running_loop()
+        opens_at = loop.time() + min_s
+        try:
+            plan = await asyncio.wait_for(asyncio.shield(entrance), max_s)
+        except asyncio.TimeoutError:
+            entrance.cancel()
+            plan = await self._stock_entrance(target)
+        except asyncio.CancelledError:
+            entrance.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Entrance generation for '{target}' failed: {e}", exc_info=True)
+            plan = await self._stock_entrance(target)
+        await asyncio.sleep(max(0.0, opens_at - loop.time()))
+        self.memory.record(target, plan["foreground"]["transcript"])
+        return plan
+
+    def _arm_followup(self, target: str | None):
+        """Starts the handoff window once the current speaker's handoff line is out."""
+        if target and self._entrance is not None:
+            self._followup = asyncio.create_task(self._deliver_entrance(target, self._entrance))
+            self._entrance = None
+
+    def followup(self) -> asyncio.Task | None:
+        """
+        Returns the task resolving to the next unprompted plan (the incoming
+        speaker's entrance after a handoff), if one is pending. The Director
+        keeps it so `interrupt` can still cancel it.
+        """
+        return self._followup
+
+    def interrupt(self):
+        """Cancels any pending entrance; the caller moved on."""
+        for task in (self._entrance, self._followup):
+            if task is not None:
+                task.cancel()
+        self._entrance = self._followup = None
+
+    async def step_stream(self, user_text: str) -> AsyncIterator[dict]:
+        """
+        Runs one turn. Yields `plan_chunk` messages as each sentence of the
+        foreground line is voiced, then a closing `plan` with the background
+        and controls. TTS for a chunk starts as soon as the LLM finishes that
+        sentence, while later tokens are still arriving.
+        """
+        turn = await self._route(user_text)
+        if turn.plan is not None:
+            yield {"type": "plan", "data": turn.plan}
+            return
+
+        if turn.line is not None:
+            # Fixed lines go out whole, matching their pre-rendered cache entry.
+            chunks = _once(turn.line)
+        else:
+            chunks = speakable_chunks(
+                stream_character_line(turn.speaker, turn.prompt, **self._context(turn.speaker))
+            )
+        self.memory.record(USER, user_text)
+        tts_model = self._tts_model()
+        voice = voice_for(self.state, turn.speaker)
+
+        pending: asyncio.Queue = asyncio.Queue()
+        ahead = asyncio.Semaphore(MAX_CHUNKS_AHEAD)
+
+        async def produce():
+            try:
+                index = 0
+                async for chunk in chunks:
+                    await ahead.acquire()
+                    await pending.put(asyncio.create_task(
+                        pack_chunk(turn.speaker, chunk, index, tts_model=tts_model, voice=voice)
+                    ))
+                    index += 1
+            finally:
+                await pending.put(None)
+
+        producer = asyncio.create_task(produce())
+        transcript = []
+        try:
+            while (task := await pending.get()) is not None:
+                part = await task
+                transcript.append(part["transcript"])
+                yield {"type": "plan_chunk", "data": part}
+                ahead.release()  # the consumer has taken it
+            await producer  # surface errors from the LLM stream
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+            # Only what was actually sent; a barge-in cuts the line short.
+            self.memory.record(turn.speaker, " ".join(transcript))
+
+        plan = pack_stream_plan(turn.speaker, " ".join(transcript), self.state, turn.handoff_to, tts_model)
+        yield {"type": "plan", "data": plan}
+        self._arm_followup(turn.handoff_to)
+
+
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
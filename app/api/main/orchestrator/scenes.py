@@ -0,0 +1,182 @@
+"""
+Scene Registry
+Parses and validates each `scenes/*.yaml` once into an immutable compiled
+template. Sessions get a SceneState that shares the template's read-only
+parts and copies only the small mutable runtime fields. A template is
+reloaded when its file changes.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import time
+from types import MappingProxyType
+from typing import Any, Mapping
+
+import yaml
+
+from .asides import AsideSampler, AsideTable
+from .intents import IntentEngine
+from .state import SceneState
+
+class SceneError(ValueError):
+    """Raised when a scene file is missing required fields or has the wrong shape."""
+
+
+def _freeze(value):
+    """Recursively turns dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class SceneTemplate:
+    path: Path
+    mtime: float
+    scene_id: str
+    title: str
+    roomtone: str
+    walla_beds: tuple
+    intensity: float
+    characters: Mapping[str, tuple]
+    rules: Mapping[str, Any]
+    timing: Mapping[str, Any]
+    overlap: Mapping[str, Any]
+    ducking_db: int
+    tts: Mapping[str, Any]
+    background_asides: tuple
+    safety: Mapping[str, Any]
+    stop_words: tuple
+    # Compiled lookups
+    aside_table: AsideTable
+    trigger_index: Mapping[str, tuple]  # from -> ((to, keywords), ...)
+    voice_map: Mapping[str, str]
+    intents: IntentEngine
+
+    def new_state(self, seed=None) -> SceneState:
+        """A fresh per-session state; only the runtime fields are copied."""
+        foreground = self.characters.get("foreground") or ("mother",)
+        return SceneState(
+            scene_id=self.scene_id,
+            title=self.title,
+            roomtone=self.roomtone,
+            walla_beds=self.walla_beds,
+            intensity=self.intensity,
+            # Copied: Director._create_agent adds characters during a call.
+            characters={group: list(ids) for group, ids in self.characters.items()},
+            rules=self.rules,
+            timing=self.timing,
+            overlap=self.overlap,
+            ducking_db=self.ducking_db,
+            tts=self.tts,
+            background_asides=self.background_asides,
+            safety=self.safety,
+            stop_words=self.stop_words,
+            foreground=foreground[0],
+            template=self,
+            asides=AsideSampler(seed),
+        )
+
+
+def _require(cond: bool, path: Path, msg: str):
+    if not cond:
+        raise SceneError(f"{path}: {msg}")
+
+
+def compile_scene(path: Path) -> SceneTemplate:
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    with path.open("r", encoding="utf-8") as f:
+        y = yaml.safe_load(f) or {}
+
+    _require(isinstance(y, dict), path, "scene must be a mapping")
+    _require("scene_id" in y, path, "missing 'scene_id'")
+
+    characters = y.get("characters", {})
+    _require(isinstance(characters, dict), path, "'characters' must map groups to id lists")
+    for group, ids in characters.items():
+        _require(isinstance(ids, list), path, f"characters.{group} must be a list")
+
+    rules = y.get("rules", {})
+    triggers: dict[str, list] = {}
+    for i, t in enumerate(rules.get("handoff_triggers", [])):
+        _require(
+            isinstance(t, dict) and {"from", "to", "when_user_mentions"} <= t.keys(),
+            path, f"rules.handoff_triggers[{i}] needs 'from', 'to' and 'when_user_mentions'",
+        )
+        triggers.setdefault(t["from"], []).append((t["to"], tuple(t["when_user_mentions"])))
+
+    asides = y.get("background_asides", [])
+    _require(isinstance(asides, list), path, "'background_asides' must be a list")
+
+    tts = y.get("tts", {})
+    voice_map = tts.get("voice_map", {})
+    _require(isinstance(voice_map, dict), path, "tts.voice_map must be a mapping")
+
+    stop_words = tuple(y.get("stop_words", ["end call"]))
+    trigger_index = MappingProxyType({k: tuple(v) for k, v in triggers.items()})
+
+    return SceneTemplate(
+        path=path,
+        mtime=mtime,
+        scene_id=y["scene_id"],
+        title=y.get("title", y["scene_id"]),
+        roomtone=y.get("roomtone", ""),
+        walla_beds=_freeze(y.get("walla_beds", [])),
+        intensity=float(y.get("intensity", 0.5)),
+        characters=_freeze(characters),
+        rules=_freeze(rules),
+        timing=_freeze(y.get("timing", {})),
+        overlap=_freeze(y.get("overlap", {})),
+        ducking_db=int(y.get("ducking_db", -14)),
+        tts=_freeze(tts),
+        background_asides=_freeze(asides),
+        safety=_freeze(y.get("safety", {})),
+        stop_words=stop_words,
+        aside_table=AsideTable.from_scene(asides, characters),
+        trigger_index=trigger_index,
+        voice_map=_freeze(voice_map),
+        intents=IntentEngine(trigger_index, stop_words),
+    )
+
+
+class SceneRegistry:
+    """
+    Compiled scene templates keyed by path. A file is stat'ed at most once
+    per `check_interval_s` and recompiled only when its mtime moves.
+    """
+
+    def __init__(self, check_interval_s: float = 2.0):
+        self.check_interval_s = check_interval_s
+        self._templates: dict[Path, SceneTemplate] = {}
+        self._checked_at: dict[Path, float] = {}
+
+    def load(self, path) -> SceneTemplate:
+        path = Path(path).resolve()
+        template = self._templates.get(path)
+        now = time.monotonic()
+        if template and now - self._checked_at.get(path, 0.0) < self.check_interval_s:
+            return template
+
+        self._checked_at[path] = now
+        if template and os.stat(path).st_mtime == template.mtime:
+            return template
+        try:
+            template = compile_scene(path)
+        except (SceneError, yaml.YAMLError) as e:
+            if template is None:
+                raise
+            # Keep serving the last good version while the file is being edited.
+            print(f"ERROR: Could not reload scene '{path}'; keeping previous version. Details: {e}")
+            return template
+        self._templates[path] = template
+        return template
+
+    def new_state(self, path, seed=None) -> SceneState:
+        return self.load(path).new_state(seed)
+
+
+scene_registry = SceneRegistry()
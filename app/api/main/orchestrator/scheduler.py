@@ -1,11 +1,121 @@
-# orchestrator/scheduler.py
-def on_user_transcript(text):
-    intent = nlu.parse(text)  # “ask_for_brother”, “greeting”, “goodbye”, etc.
-    if state.stage == "ForegroundTalk" and intent == "ask_for_brother":
-        return director.plan_handoff(from_="mother", to_="brother")
-
-def tick():
-    # Runs every ~100ms
-    next_bg_event = director.maybe_emit_background(state)
-    if next_bg_event:
-        queue_audio(next_bg_event)
+"""
+Background Scheduler
+Emits background asides for every live session from a single task. Sessions
+wait on one heap keyed by their next due time, so the task wakes only when
+some session is actually due, however many sessions are open.
+"""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+from .nlg import aside_lines
+from .session import Session, SessionManager
+
+# Mean gap between asides at intensity 1.0; it grows as the room quiets down.
+MEAN_GAP_S = 8.0
+MIN_GAP_S = 2.0
+MAX_GAP_S = 60.0
+# Keep the room quiet right after the user or a character has spoken.
+QUIET_AFTER_ACTIVITY_S = 3.0
+SEND_TIMEOUT_S = 2.0
+
+Emit = Callable[[Session, dict], Awaitable[None]]
+
+
+async def send_to_transport(session: Session, message: dict) -> None:
+    if session.outbox is not None:
+        # Queued behind the call's own messages; dropped if the client is behind.
+        session.outbox.offer(message)
+        return
+    await session.transport.send_json(message)
+
+
+class BackgroundScheduler:
+    def __init__(self, sessions: SessionManager, emit: Emit = send_to_transport):
+        self.sessions = sessions
+        self.emit = emit
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._sends: set[asyncio.Task] = set()
+        self.emitted = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._sends):
+            task.cancel()
+
+    def add(self, session: Session):
+        """Starts scheduling asides for a session. Closed sessions drop out on their own."""
+        self._push(session, time.monotonic() + self._gap(session))
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _gap(self, session: Session) -> float:
+        state = session.state
+        intensity = max(float(state.intensity), 0.05)
+        rng = state.asides.rng if state.asides is not None else None
+        gap = rng.expovariate(intensity / MEAN_GAP_S) if rng else MEAN_GAP_S / intensity
+        return min(max(gap, MIN_GAP_S), MAX_GAP_S)
+
+    def _push(self, session: Session, due: float):
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._seq), session.session_id))
+        if earliest is None or due < earliest:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                timeout = None
+            else:
+                timeout = self._heap[0][0] - time.monotonic()
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, session_id = heapq.heappop(self._heap)
+                session = self.sessions.peek(session_id)
+                if session is None or session.transport is None:
+                    continue  # closed; drop it
+                self._fire(session, now)
+
+    def _fire(self, session: Session, now: float):
+        quiet_until = session.last_seen + QUIET_AFTER_ACTIVITY_S
+        if session.in_turn or now < quiet_until:
+            # Don't talk over a turn; try again once things settle.
+            self._push(session, max(quiet_until, now + MIN_GAP_S))
+            return
+
+        getter = self.sessions.tts_model_getter
+        background = aside_lines(session.state, max_asides=1, tts_model=getter() if getter else None)
+        if background:
+            task = asyncio.create_task(self._send(session, {"type": "background", "data": background}))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+        self._push(session, now + self._gap(session))
+
+    async def _send(self, session: Session, message: dict):
+        try:
+            await asyncio.wait_for(self.emit(session, message), SEND_TIMEOUT_S)
+            self.emitted += 1
+        except Exception:
+            pass  # the socket handler notices a dead client and closes the session
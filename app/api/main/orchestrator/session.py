@@ -0,0 +1,135 @@
+"""
+Session Manager
+Gives every connection its own SceneState/Director pair, created from the
+compiled scene template (see scenes.SceneRegistry).
+"""
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+import itertools
+from typing import Any, Iterator
+import time
+import uuid
+
+from .state import SceneState
+from .router import Director
+from .scenes import SceneRegistry, scene_registry
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session would exceed the configured cap."""
+
+
+@dataclass
+class Session:
+    session_id: str
+    state: SceneState
+    director: Director
+    transport: Any = None  # e.g. the WebSocket serving this session
+    # The call's pipeline.Pipeline, if the transport runs one, and its queue
+    # of messages for the client.
+    pipeline: Any = None
+    outbox: Any = None
+    created_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    in_turn: bool = False  # a reply is being generated or sent
+    turn: asyncio.Task | None = None  # the reply in progress, if any
+    # Voiced lines go inline as audio frames instead of as file URLs.
+    inline_audio: bool = False
+    audio_codec: str = "pcm"  # codec of inline frames, negotiated on connect
+    # Server stream ids start above any the client uses for its microphone.
+    audio_streams: Iterator[int] = field(default_factory=lambda: itertools.count(1 << 16))
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def cancel_turn(self) -> bool:
+        """
+        Cancels the reply in progress: its LLM stream, TTS renders and pending
+        sends, plus any follow-up. Returns whether a turn was running.
+        """
+        self.director.interrupt()
+        if self.turn is None or self.turn.done():
+            return False
+        self.turn.cancel()
+        return True
+
+
+class SessionManager:
+    """Registry of live sessions with idle eviction and a hard cap."""
+
+    def __init__(
+        self,
+        scene_path,
+        max_sessions: int = 500,
+        idle_timeout_s: float = 900.0,
+        tts_model_getter=None,
+        registry: SceneRegistry = scene_registry,
+        seed=None,
+    ):
+        self.scene_path = scene_path
+        self.registry = registry
+        # With a seed, session N always draws the same asides (for load tests).
+        self.seed = seed
+        self._opened = 0
+        self.max_sessions = max_sessions
+        self.idle_timeout_s = idle_timeout_s
+        self.tts_model_getter = tts_model_getter
+        self._sessions: dict[str, Session] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self._sessions.values()))
+
+    def open(self, transport: Any = None) -> Session:
+        """Creates a new session with a fresh state from the scene template."""
+        if len(self._sessions) >= self.max_sessions:
+            raise SessionLimitError(f"Session limit reached ({self.max_sessions}).")
+
+        # Picks up edits to the scene file without a restart.
+        seed = None if self.seed is None else f"{self.seed}:{self._opened}"
+        self._opened += 1
+        state = self.registry.new_state(self.scene_path, seed=seed)
+        session_id = uuid.uuid4().hex
+        session = Session(
+            session_id=session_id,
+            state=state,
+            director=Director(state, tts_model_getter=self.tts_model_getter, session_id=session_id),
+            transport=transport,
+        )
+        self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Session | None:
+        session = self._sessions.get(session_id)
+        if session:
+            session.touch()
+        return session
+
+    def peek(self, session_id: str) -> Session | None:
+        """Like `get`, but doesn't count as activity."""
+        return self._sessions.get(session_id)
+
+    def close(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.cancel_turn()
+            session.director.memory.close()
+
+    def evict_idle(self, now: float | None = None) -> list[Session]:
+        """
+        Drops sessions that have not been touched within the idle timeout and
+        returns them so the caller can close their transports.
+        """
+        now = time.monotonic() if now is None else now
+        expired = [
+            s for s in self._sessions.values()
+            if now - s.last_seen > self.idle_timeout_s
+        ]
+        for s in expired:
+            del self._sessions[s.session_id]
+            s.cancel_turn()
+            s.director.memory.close()
+        return expired
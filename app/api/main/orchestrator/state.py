@@ -1,7 +1,7 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+import copy
+from dataclasses import dataclass, field, replace
 from typing import List, Dict, Any
-import yaml
 
 @dataclass
 class SceneState:
@@ -24,24 +24,25 @@ class SceneState:
     foreground: str = "mother"
     last_user_text: str = ""
     memory: Dict[str, Any] = field(default_factory=dict)
+    # The compiled scene this state was created from (see scenes.SceneTemplate).
+    template: Any = field(default=None, repr=False, compare=False)
+    # Per-session aside RNG and no-repeat history (see asides.AsideSampler).
+    asides: Any = field(default=None, repr=False, compare=False)
 
     @classmethod
     def from_yaml(cls, path):
-        with open(path, "r", encoding="utf-8") as f:
-            y = yaml.safe_load(f)
-        return cls(
-            scene_id=y["scene_id"],
-            title=y.get("title", y["scene_id"]),
-            roomtone=y.get("roomtone",""),
-            walla_beds=y.get("walla_beds",[]),
-            intensity=float(y.get("intensity",0.5)),
-            characters=y.get("characters",{}),
-            rules=y.get("rules",{}),
-            timing=y.get("timing",{}),
-            overlap=y.get("overlap",{}),
-            ducking_db=int(y.get("ducking_db",-14)),
-            tts=y.get("tts",{}),
-            background_asides=y.get("background_asides",[]),
-            safety=y.get("safety",{}),
-            stop_words=y.get("stop_words",["end call"])
+        """Creates a state from a scene file, parsing it only if it changed."""
+        from .scenes import scene_registry
+        return scene_registry.new_state(path)
+
+    def clone(self) -> SceneState:
+        """
+        Returns an independent copy so one session can't mutate another's scene.
+        Scene data is read-only and shared; only runtime fields are copied.
+        """
+        return replace(
+            self,
+            characters={group: list(ids) for group, ids in self.characters.items()},
+            memory=copy.deepcopy(self.memory),
+            asides=None,
         )
@@ -0,0 +1,91 @@
+"""
+TTS Service Client
+Lets the API voice lines through the standalone TTS service
+(`services/tts`) instead of a model loaded in-process.
+"""
+from __future__ import annotations
+import io
+from pathlib import Path
+import wave
+
+import httpx
+
+from app.api.main.audio import aencode_opus, encode_opus
+from app.api.main.telemetry import span
+
+
+class RemoteTTS:
+    """
+    Synthesizes through the TTS service's `/tts` endpoint.
+
+    `render` blocks and is meant for the TTS executor, like an in-process
+    model's `generate`. `arender` is the async form used while serving
+    calls: cancelling it drops the request, so the service stops working on
+    a line nobody will hear.
+
+    Lines come back in `format` ("wav" or "opus"). If the service can't
+    encode Opus it is asked for WAV, which is encoded here instead.
+    """
+
+    def __init__(self, base_url: str, timeout_s: float = 20.0, format: str = "wav"):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.format = format
+        self._service_format = format
+        self.client = httpx.Client(base_url=self.base_url, timeout=timeout_s)
+        self._aclient: httpx.AsyncClient | None = None
+        self._model_id: str | None = None
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the service's backend (once probed) so cached audio is keyed to it."""
+        return self._model_id or f"tts-service:{self.base_url}"
+
+    def probe(self) -> bool:
+        """Asks the service which backend it runs; returns False if it is unreachable."""
+        try:
+            health = self.client.get("/health").json()
+        except (httpx.HTTPError, ValueError):
+            return False
+        self._model_id = f"tts-service:{health.get('backend', 'unknown')}"
+        if self.format not in health.get("formats", ["wav"]):
+            self._service_format = "wav"
+        return True
+
+    def _request(self, text: str, voice: str) -> dict:
+        return {"text": text, "voice": voice, "format": self._service_format}
+
+    def _transcodes(self, r: httpx.Response) -> bool:
+        """True when the service sent WAV for an Opus cache."""
+        return self.format == "opus" and not r.headers.get("content-type", "").startswith("audio/ogg")
+
+    def render(self, text: str, voice: str, path: Path) -> None:
+        with span("tts_synthesis"):
+            r = self.client.post("/tts", json=self._request(text, voice))
+            r.raise_for_status()
+            audio = encode_opus(*_wav_pcm(r.content)) if self._transcodes(r) else r.content
+        with span("tts_write"):
+            Path(path).write_bytes(audio)
+
+    async def arender(self, text: str, voice: str, path: Path) -> None:
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout_s)
+        with span("tts_synthesis"):
+            r = await self._aclient.post("/tts", json=self._request(text, voice))
+            r.raise_for_status()
+            audio = await aencode_opus(*_wav_pcm(r.content)) if self._transcodes(r) else r.content
+        with span("tts_write"):
+            Path(path).write_bytes(audio)
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
+
+def _wav_pcm(data: bytes) -> tuple[bytes, int]:
+    with wave.open(io.BytesIO(data), "rb") as w:
+        return w.readframes(w.getnframes()), w.getframerate()
@@ -0,0 +1,52 @@
+"""
+Stock Line Warm-up
+Pre-renders the lines a scene speaks verbatim into the audio cache, so they
+play back without any synthesis latency: background asides (sent with
+their cached audio), and each persona's handoff lines and entrances
+(spoken by the Director on a handoff). Must-hit lines, goodbyes and
+smalltalk only steer the LLM and are never spoken as written.
+"""
+from __future__ import annotations
+import asyncio
+
+from .nlg import persona_registry, voice_for, voice_line, voice_map
+from .safety import sanitize
+from .state import SceneState
+
+# Persona fields whose lines are played as written (see Director._stock_line).
+PERSONA_LINE_FIELDS = ("entrances", "handoff_lines")
+
+
+def collect_stock_lines(state: SceneState) -> list[tuple[str, str]]:
+    """Returns the unique `(speaker, sanitized line)` pairs a scene can speak verbatim."""
+    lines = []
+    for group in state.background_asides:
+        speaker = group.get("speaker")
+        if speaker:
+            lines.extend((speaker, line) for line in group.get("lines", []))
+
+    speakers = {pid for group in state.characters.values() for pid in group}
+    speakers.update(voice_map(state))
+    for pid in sorted(speakers):
+        try:
+            persona = persona_registry.get(pid)
+        except (ValueError, IOError) as e:
+            print(f"WARNING: Skipping stock lines for '{pid}'. Details: {e}")
+            continue
+        if persona is None:
+            continue
+        for field in PERSONA_LINE_FIELDS:
+            lines.extend((pid, line) for line in persona.data.get(field, []))
+
+    # Lines are voiced exactly as pack_plan would voice them.
+    return list(dict.fromkeys((speaker, sanitize(line)) for speaker, line in lines))
+
+
+async def prerender_stock_lines(state: SceneState, tts_model) -> int:
+    """Voices every stock line into the audio cache; returns how many are now cached."""
+    lines = collect_stock_lines(state)
+    # voice_line already bounds concurrency through the TTS executor.
+    results = await asyncio.gather(*(
+        voice_line(tts_model, line, voice_for(state, speaker)) for speaker, line in lines
+    ))
+    return sum(1 for (_, line), url in zip(lines, results) if url != line)
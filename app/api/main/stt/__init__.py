@@ -0,0 +1,51 @@
+"""
+STT Backend Factory
+This module provides the streaming recognizer and a factory that builds the
+shared model pool for the backend selected in `stt_config.yaml`.
+"""
+
+from .base import BaseSTT
+from .ctranslate2_whisper import FasterWhisper
+from .openai_whisper import OpenAIWhisper
+from .pool import STTModelPool
+from .streaming import EnergyVAD, Int16Ring, StreamingRecognizer, STTEvent
+
+def get_stt_pool() -> STTModelPool:
+    """
+    Factory function that reads the `stt_config.yaml` and returns an (unloaded)
+    pool of the configured STT backend.
+    """
+    config = BaseSTT.load_config()
+    provider_name = config.get("active_provider")
+
+    if not provider_name:
+        raise ValueError("STT configuration error: 'active_provider' is not set in stt_config.yaml.")
+
+    provider_config = config.get("providers", {}).get(provider_name)
+    if not provider_config:
+        raise ValueError(f"STT configuration error: No settings found for provider '{provider_name}'.")
+
+    pool_size = int(config.get("pool_size", 2))
+    try:
+        if provider_name == "faster-whisper":
+            backend_cls = FasterWhisper
+            kwargs = dict(
+                model_size=provider_config["model_size"],
+                language=provider_config.get("language", "en"),
+                device=provider_config.get("device", "cpu"),
+                compute_type=provider_config.get("compute_type", "int8"),
+                cpu_threads=provider_config.get("cpu_threads", 2),
+                beam_size=provider_config.get("beam_size", 1),
+            )
+        elif provider_name == "openai-whisper":
+            backend_cls = OpenAIWhisper
+            kwargs = dict(
+                model_size=provider_config["model_size"],
+                language=provider_config.get("language", "en"),
+            )
+        else:
+            raise ValueError(f"Unsupported STT provider specified: '{provider_name}'")
+    except KeyError as e:
+        raise KeyError(f"Missing required configuration key for '{provider_name}': {e}")
+
+    return STTModelPool(lambda: backend_cls(**kwargs), size=pool_size)
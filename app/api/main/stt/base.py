@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+import numpy as np
+import yaml
+from pathlib import Path
+
+class BaseSTT(ABC):
+    """Abstract base class for all speech-to-text backends."""
+
+    def __init__(self, model_size: str, language: str | None = "en"):
+        """
+        Initializes the backend. The model itself is loaded by `load`.
+
+        Args:
+            model_size: The model to load (e.g., "tiny.en", "base.en", "small").
+            language: Spoken language hint, or None to auto-detect.
+        """
+        self.model_size = model_size
+        self.language = language
+
+    @abstractmethod
+    def load(self) -> None:
+        """Loads the model. Blocking; call it off the event loop."""
+        pass
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray) -> str:
+        """
+        Transcribes one utterance.
+
+        Args:
+            audio: Mono float32 samples in [-1, 1] at 16 kHz.
+
+        Returns:
+            The recognized text.
+        """
+        pass
+
+    @staticmethod
+    def load_config() -> dict:
+        """Loads the STT configuration from the root `stt_config.yaml` file."""
+        config_path = Path("stt_config.yaml")
+        if not config_path.exists():
+            raise FileNotFoundError("stt_config.yaml not found in the project root.")
+        with config_path.open("r", encoding="utf-8") as f:
+            return yaml.safe_load(f)
@@ -0,0 +1,52 @@
+import numpy as np
+from .base import BaseSTT
+
+class FasterWhisper(BaseSTT):
+    """
+    STT backend for `faster-whisper`, which runs Whisper on CTranslate2.
+    With int8 weights it is several times faster than openai-whisper on CPU
+    and needs neither torch nor Triton.
+    """
+
+    def __init__(
+        self,
+        model_size: str,
+        language: str | None = "en",
+        device: str = "cpu",
+        compute_type: str = "int8",
+        cpu_threads: int = 2,
+        beam_size: int = 1,
+    ):
+        """
+        Args:
+            model_size: The model to load (e.g., "tiny.en", "base.en", "small").
+            language: Spoken language hint, or None to auto-detect.
+            device: "cpu" or "cuda".
+            compute_type: CTranslate2 quantization, e.g. "int8", "int8_float16", "float32".
+            cpu_threads: Intra-op threads for this model instance.
+            beam_size: Decoding beam; 1 (greedy) keeps latency lowest.
+        """
+        super().__init__(model_size=model_size, language=language)
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.beam_size = beam_size
+        self.model = None
+
+    def load(self) -> None:
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        segments, _ = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=self.beam_size,
+            condition_on_previous_text=False,
+        )
+        return " ".join(seg.text.strip() for seg in segments).strip()
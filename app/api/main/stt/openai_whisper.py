@@ -0,0 +1,17 @@
+import numpy as np
+from .base import BaseSTT
+
+class OpenAIWhisper(BaseSTT):
+    """STT backend for the reference `openai-whisper` package (PyTorch)."""
+
+    def __init__(self, model_size: str, language: str | None = "en"):
+        super().__init__(model_size=model_size, language=language)
+        self.model = None
+
+    def load(self) -> None:
+        import whisper  # Pulls in torch; only paid for when this backend is used.
+        self.model = whisper.load_model(self.model_size)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        result = self.model.transcribe(audio, fp16=False, language=self.language)
+        return result["text"].strip()
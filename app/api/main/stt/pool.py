@@ -0,0 +1,47 @@
+"""
+STT Model Pool
+A few loaded model instances shared by every session. A transcription
+checks an instance out for the duration of the call, so concurrency is
+bounded by the pool size and no instance is used by two threads at once.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import queue
+from typing import Callable
+
+import numpy as np
+
+from .base import BaseSTT
+
+
+class STTModelPool:
+    def __init__(self, factory: Callable[[], BaseSTT], size: int = 2):
+        """
+        Args:
+            factory: Builds one (unloaded) backend instance.
+            size: Number of model instances, and so of concurrent transcriptions.
+        """
+        self.factory = factory
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        # One thread per instance: work beyond that waits in the executor
+        # queue rather than in threads blocked on checkout.
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="stt")
+
+    def load(self) -> None:
+        """Loads every instance. Blocking; call it off the event loop."""
+        for _ in range(self.size):
+            backend = self.factory()
+            backend.load()
+            self._idle.put(backend)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        backend = self._idle.get()
+        try:
+            return backend.transcribe(audio)
+        finally:
+            self._idle.put(backend)
+
+    @property
+    def busy(self) -> int:
+        return self.size - self._idle.qsize()
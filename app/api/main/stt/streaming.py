@@ -0,0 +1,234 @@
+"""
+Streaming Speech Recognition
+Turns a live stream of 16-bit PCM into speech-start events, partial
+hypotheses while the caller is talking, and a final transcript at the end
+of speech. Audio is held in fixed-size int16 ring buffers, so memory does
+not grow with the length of a call.
+"""
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+import math
+from typing import AsyncIterator, Callable
+
+import numpy as np
+
+
+@dataclass
+class STTEvent:
+    type: str  # "speech_start" | "partial" | "final"
+    text: str = ""
+
+
+class Int16Ring:
+    """Fixed-capacity ring of int16 samples; the oldest samples are overwritten."""
+
+    def __init__(self, capacity: int):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def capacity(self) -> int:
+        return self._buf.size
+
+    @property
+    def full(self) -> bool:
+        return self._len == self._buf.size
+
+    def extend(self, samples: np.ndarray):
+        cap = self._buf.size
+        if samples.size >= cap:
+            self._buf[:] = samples[-cap:]
+            self._start, self._len = 0, cap
+            return
+        end = (self._start + self._len) % cap
+        first = min(samples.size, cap - end)
+        self._buf[end:end + first] = samples[:first]
+        self._buf[:samples.size - first] = samples[first:]
+        overflow = max(0, self._len + samples.size - cap)
+        self._start = (self._start + overflow) % cap
+        self._len = min(cap, self._len + samples.size)
+
+    def samples(self) -> np.ndarray:
+        """Returns a copy of the buffered samples, oldest first."""
+        return np.roll(self._buf, -self._start)[:self._len]
+
+    def snapshot(self) -> np.ndarray:
+        """Returns the buffered samples, oldest first, as float32 in [-1, 1]."""
+        return self.samples().astype(np.float32) / 32768.0
+
+    def clear(self):
+        self._start = self._len = 0
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detection on signal energy, with a noise floor
+    that adapts while nobody is talking.
+    """
+
+    def __init__(self, margin_db: float = 10.0, min_threshold_db: float = -45.0):
+        self.margin_db = margin_db
+        self.min_threshold_db = min_threshold_db
+        self.noise_db = -60.0
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = math.sqrt(float(np.mean(np.square(frame, dtype=np.float64)))) / 32768.0
+        level_db = 20.0 * math.log10(max(rms, 1e-9))
+        voiced = level_db > max(self.noise_db + self.margin_db, self.min_threshold_db)
+        if not voiced:
+            # Track the floor slowly so background noise doesn't read as speech.
+            self.noise_db = 0.95 * self.noise_db + 0.05 * level_db
+        return voiced
+
+
+class StreamingRecognizer:
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], str],
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        start_ms: int = 90,
+        endpoint_ms: int = 700,
+        partial_interval_ms: int = 400,
+        preroll_ms: int = 300,
+        max_utterance_s: float = 20.0,
+        vad: EnergyVAD | None = None,
+        executor=None,
+    ):
+        """
+        Args:
+            transcribe: Blocking function from float32 mono audio to text.
+            sample_rate: Rate of the incoming PCM.
+            frame_ms: VAD frame size.
+            start_ms: Voiced audio needed before speech is considered started.
+            endpoint_ms: Trailing silence that ends an utterance.
+            partial_interval_ms: How often a partial hypothesis is attempted.
+            preroll_ms: Audio kept from before the speech start so onsets aren't clipped.
+            max_utterance_s: Utterances are finalized when they reach this length.
+            vad: Voice activity detector; defaults to EnergyVAD.
+            executor: Where `transcribe` runs; None uses the loop's default executor.
+        """
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.endpoint_frames = max(1, endpoint_ms // frame_ms)
+        self.partial_samples = sample_rate * partial_interval_ms // 1000
+        self.vad = vad or EnergyVAD()
+        self.executor = executor
+
+        self._pending = np.zeros(0, dtype=np.int16)  # less than one VAD frame
+        self._preroll = Int16Ring(sample_rate * preroll_ms // 1000)
+        self._utterance = Int16Ring(int(sample_rate * max_utterance_s))
+        self._in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._since_partial = 0
+        self._partial_task: asyncio.Task | None = None
+        self._last_partial = ""
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    def _frames(self, samples: np.ndarray):
+        """VAD frames as views into `samples`; only a leftover partial frame is copied."""
+        if self._pending.size:
+            need = self.frame_len - self._pending.size
+            head = np.concatenate((self._pending, samples[:need]))
+            samples = samples[need:]
+            if head.size < self.frame_len:
+                self._pending = head
+                return
+            yield head
+        usable = samples.size - samples.size % self.frame_len
+        for i in range(0, usable, self.frame_len):
+            yield samples[i:i + self.frame_len]
+        self._pending = samples[usable:].copy()
+
+    async def _run_transcribe(self, audio: np.ndarray) -> str:
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self.executor, self.transcribe, audio)
+        return (text or "").strip()
+
+    def _start_partial(self):
+        # Never queue partials: if one is still running, skip this one.
+        if self._partial_task is None or self._partial_task.done():
+            self._partial_task = asyncio.create_task(self._run_transcribe(self._utterance.snapshot()))
+        self._since_partial = 0
+
+    def _take_partial(self) -> STTEvent | None:
+        task = self._partial_task
+        if task is None or not task.done():
+            return None
+        self._partial_task = None
+        if task.cancelled() or task.exception() is not None:
+            return None
+        text = task.result()
+        if text and text != self._last_partial:
+            self._last_partial = text
+            return STTEvent("partial", text)
+        return None
+
+    async def _finalize(self) -> STTEvent | None:
+        if self._partial_task is not None:
+            self._partial_task.cancel()
+            self._partial_task = None
+        audio = self._utterance.snapshot()
+        self._utterance.clear()
+        self._in_speech = False
+        self._voiced_run = self._silent_run = self._since_partial = 0
+        self._last_partial = ""
+        text = await self._run_transcribe(audio) if audio.size else ""
+        return STTEvent("final", text) if text else None
+
+    async def feed(self, pcm: bytes | np.ndarray) -> AsyncIterator[STTEvent]:
+        """
+        Consumes a chunk of int16 PCM (little-endian bytes, or an int16 array
+        such as `Frame.samples()`) and yields any resulting events.
+        """
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2")
+        for frame in self._frames(samples):
+            voiced = self.vad.is_speech(frame)
+            if not self._in_speech:
+                self._preroll.extend(frame)
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run >= self.start_frames:
+                    self._in_speech = True
+                    self._silent_run = 0
+                    self._utterance.extend(self._preroll.samples())
+                    self._preroll.clear()
+                    yield STTEvent("speech_start")
+                continue
+
+            self._utterance.extend(frame)
+            self._since_partial += frame.size
+            self._silent_run = 0 if voiced else self._silent_run + 1
+
+            if self._silent_run >= self.endpoint_frames or self._utterance.full:
+                final = await self._finalize()
+                if final:
+                    yield final
+                continue
+
+            partial = self._take_partial()
+            if partial:
+                yield partial
+            if self._since_partial >= self.partial_samples:
+                self._start_partial()
+
+    async def flush(self) -> STTEvent | None:
+        """Ends the current utterance now (e.g. push-to-talk released)."""
+        if not self._in_speech:
+            self._preroll.clear()
+            return None
+        return await self._finalize()
+
+    def close(self):
+        if self._partial_task is not None:
+            self._partial_task.cancel()
@@ -0,0 +1,166 @@
+"""
+Telemetry
+Latency spans for the steps of a turn, exported as Prometheus histograms on
+`/metrics`, plus per-turn traces in the log.
+
+A span times one step (`with span("llm"):`) and observes it into the
+`ether_span_seconds` histogram under its name. Inside `turn_trace`, spans
+are also collected for that turn, including those in tasks the turn starts
+(they inherit the trace through the context), and logged together when it
+ends, so one slow turn can be read step by step.
+
+A turn ends once its last message is queued for the client, and turn times
+are measured to that point; a handoff's entrance that follows is timed as
+its own `handoff_entrance` span. Turns that are cancelled (the caller
+barged in) or fail are logged but not observed as a `total`. Sending runs in the call pipeline's send stage,
+outside any turn, so `ws_send` and time spent in the send queue only show
+up in the histograms (`ws_send` spans, the send stage's wait), never in a
+turn's trace.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import time
+from typing import Callable, Iterable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = CollectorRegistry()
+
+# From cache hits and sanitizing (milliseconds) to full LLM replies (seconds).
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SPAN_SECONDS = Histogram(
+    "ether_span_seconds",
+    "Time spent in one step of a turn. ws_send is timed in the send stage and is not part of turn traces.",
+    ["span"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+TURN_SECONDS = Histogram(
+    "ether_turn_seconds",
+    "Turn latency up to enqueueing for the client (send queueing excluded): "
+    "to the first voiced chunk, and to the last message.",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+STAGE_SECONDS = Histogram(
+    "ether_pipeline_stage_seconds",
+    "Per item in a call pipeline stage: time queued (wait) and in the handler (service).",
+    ["stage", "phase"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+STAGE_ITEMS = Counter(
+    "ether_pipeline_items",
+    "Items through each call pipeline stage by outcome: processed, error, dropped or coalesced.",
+    ["stage", "outcome"],
+    registry=REGISTRY,
+)
+
+# Spans of the turn being traced in this context, as [name, seconds] pairs.
+_trace: ContextVar[list | None] = ContextVar("ether_turn_trace", default=None)
+
+
+def observe(name: str, seconds: float):
+    SPAN_SECONDS.labels(name).observe(seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Times the enclosed block as the span `name`, even if it raises or is cancelled."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+class TurnTrace:
+    def __init__(self, turn_id: str):
+        self.turn_id = turn_id
+        self.start = time.perf_counter()
+        self.first_audio_s: float | None = None
+        self.spans: list[tuple[str, float]] = []
+
+    def first_audio(self):
+        """Marks when the turn's first voiced chunk was handed to the client's queue."""
+        if self.first_audio_s is None:
+            self.first_audio_s = time.perf_counter() - self.start
+            TURN_SECONDS.labels("first_audio").observe(self.first_audio_s)
+
+    def summary(self, completed: bool = True) -> str:
+        # Repeated spans (one per streamed chunk) are folded into a total and count.
+        totals: dict[str, list] = {}
+        for name, seconds in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        steps = ", ".join(
+            f"{name} {seconds * 1000:.0f}ms" + (f" x{count}" if count > 1 else "")
+            for name, (seconds, count) in totals.items()
+        )
+        first = f"first audio {self.first_audio_s * 1000:.0f}ms, " if self.first_audio_s is not None else ""
+        ended = "total" if completed else "abandoned after"
+        return f"Turn {self.turn_id}: {first}{ended} {(time.perf_counter() - self.start) * 1000:.0f}ms [{steps}]"
+
+
+@contextmanager
+def turn_trace(turn_id: str) -> Iterator[TurnTrace]:
+    trace = TurnTrace(turn_id)
+    token = _trace.set(trace.spans)
+    completed = False
+    try:
+        yield trace
+        completed = True
+    finally:
+        _trace.reset(token)
+        if completed:
+            TURN_SECONDS.labels("total").observe(time.perf_counter() - trace.start)
+        logger.info(trace.summary(completed))
+
+
+class GaugeCollector:
+    """
+    Gauges read at scrape time, e.g. live sessions or queue depths, so
+    nothing has to keep them up to date.
+    """
+
+    def __init__(self):
+        self._gauges: list[tuple[str, str, list[str], Callable[[], Iterable[tuple[tuple, float]]]]] = []
+
+    def add(self, name: str, documentation: str, read: Callable[[], float]):
+        self._gauges.append((name, documentation, [], lambda: [((), read())]))
+
+    def add_labeled(self, name: str, documentation: str, labels: list[str], read: Callable[[], Iterable[tuple[tuple, float]]]):
+        """`read` returns (label values, value) pairs."""
+        self._gauges.append((name, documentation, labels, read))
+
+    def collect(self):
+        for name, documentation, labels, read in self._gauges:
+            family = GaugeMetricFamily(name, documentation, labels=labels)
+            try:
+                samples = list(read())
+            except Exception as e:
+                logger.warning(f"Could not read gauge {name}: {e}")
+                continue
+            for label_values, value in samples:
+                family.add_metric(list(label_values), value)
+            yield family
+
+
+gauges = GaugeCollector()
+REGISTRY.register(gauges)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """The registry in the Prometheus text format, and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,120 @@
+"""
+Micro-batching for TTS inference.
+Requests that arrive within a short window are run through the model as one
+batch, then each caller gets its own result back.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, Callable
+
+
+class BatchScheduler:
+    def __init__(
+        self,
+        run_batch: Callable[[list[str]], list[Any]],
+        max_batch: int = 8,
+        max_wait_ms: float = 25.0,
+        executor=None,
+    ):
+        """
+        Args:
+            run_batch: Blocking function mapping a list of texts to one result per text.
+            max_batch: Largest batch handed to the model.
+            max_wait_ms: How long the first request in a batch waits for company.
+            executor: Where `run_batch` runs; None uses the loop's default executor.
+        """
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.executor = executor
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # Counters for /stats
+        self.batches = 0
+        self.items = 0
+        self.max_depth_seen = 0
+        self.last_batch_s = 0.0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Fail anything still waiting rather than leaving callers hanging.
+        while self._queue and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("TTS batcher stopped."))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit(self, text: str) -> Any:
+        """Queues one text and waits for its result."""
+        if self._queue is None:
+            raise RuntimeError("TTS batcher is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        self.max_depth_seen = max(self.max_depth_seen, self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (e.g. disconnected) don't need synthesis.
+        return [(text, f) for text, f in batch if not f.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            started = time.monotonic()
+            try:
+                results = list(await loop.run_in_executor(self.executor, self.run_batch, texts))
+                if len(results) != len(batch):
+                    # Pairing results to callers by position would be wrong for some of them.
+                    raise RuntimeError(f"TTS batch returned {len(results)} results for {len(batch)} texts.")
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.last_batch_s = time.monotonic() - started
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_depth_seen,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "last_batch_s": self.last_batch_s,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+        }
@@ -1,10 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-# from chatterbox_tts import ChatterboxTTS
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import torch
 import io
 import logging
+import os
+
+from app.api.tts.batcher import BatchScheduler
+
+try:
+    from chatterbox_tts import ChatterboxTTS
+except ImportError:
+    ChatterboxTTS = None
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -24,19 +33,66 @@ app_state = {
     "tts_model": None,
 }
 
+# --- Batching ---
+# Concurrent requests are grouped into one model call instead of each
+# request fighting the others for the CPU. Only models with a batch API
+# (`generate_batch`) go through the batcher; for others a batch would just
+# be the same calls in a row after `max_wait_ms` of waiting.
+MAX_BATCH = int(os.getenv("TTS_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("TTS_MAX_WAIT_MS", "25"))
+
+# A single inference thread: batches run one after another on the model.
+_inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-infer")
+
+
+def generate_batch(texts: list[str]) -> list:
+    """Runs one batch through the model's batch API."""
+    return list(app_state["tts_model"].generate_batch(texts))
+
+
+def supports_batching(model) -> bool:
+    return hasattr(model, "generate_batch")
+
+
+async def generate(text: str):
+    """Synthesizes one text, batched with concurrent requests when the model supports it."""
+    model = app_state["tts_model"]
+    if supports_batching(model):
+        return await batcher.submit(text)
+    # Still on the single inference thread, so requests don't thrash the model.
+    return await asyncio.get_running_loop().run_in_executor(_inference_executor, model.generate, text)
+
+
+batcher = BatchScheduler(
+    generate_batch,
+    max_batch=MAX_BATCH,
+    max_wait_ms=MAX_WAIT_MS,
+    executor=_inference_executor,
+)
+
+
 # --- Model Loading ---
-# @app.on_event("startup")
-# async def startup_event():
-#     """On startup, load the TTS model."""
-#     logger.info("TTS service starting up...")
-#     try:
-#         app_state["tts_model"] = ChatterboxTTS.from_pretrained(device="cpu")
-#         logger.info("TTS model loaded successfully.")
-#     except Exception as e:
-#         logger.error(f"Could not load ChatterboxTTS model: {e}", exc_info=True)
-#         # We might want to prevent the app from starting if the model fails to load
-#         # For now, we'll log the error and continue.
-#         app_state["tts_model"] = None
+@app.on_event("startup")
+async def startup_event():
+    """On startup, load the TTS model and start the batch scheduler."""
+    logger.info("TTS service starting up...")
+    batcher.start()
+    if ChatterboxTTS is None:
+        logger.error("chatterbox-tts is not installed; /synthesize will be unavailable.")
+        return
+    try:
+        app_state["tts_model"] = ChatterboxTTS.from_pretrained(device="cpu")
+        logger.info("TTS model loaded successfully.")
+    except Exception as e:
+        logger.error(f"Could not load ChatterboxTTS model: {e}", exc_info=True)
+        # We might want to prevent the app from starting if the model fails to load
+        # For now, we'll log the error and continue.
+        app_state["tts_model"] = None
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await batcher.stop()
 
 
 class SynthesizeRequest(BaseModel):
@@ -46,28 +102,35 @@ class SynthesizeRequest(BaseModel):
 async def root():
     return {"status": "ok"}
 
-# @app.post("/synthesize")
-# async def synthesize(request: SynthesizeRequest):
-#     """
-#     Synthesizes audio from text using the loaded ChatterboxTTS model.
-#     """
-#     if app_state["tts_model"] is None:
-#         raise HTTPException(status_code=503, detail="TTS model is not available.")
+@app.get("/stats")
+async def stats():
+    """Batching and queue-depth counters."""
+    return {**batcher.stats(), "batching": supports_batching(app_state["tts_model"])}
+
+@app.post("/synthesize")
+async def synthesize(request: SynthesizeRequest):
+    """
+    Synthesizes audio from text using the loaded ChatterboxTTS model.
+    """
+    if app_state["tts_model"] is None:
+        raise HTTPException(status_code=503, detail="TTS model is not available.")
 
-#     try:
-#         logger.info(f"Synthesizing text: {request.text}")
-#         wav = app_state["tts_model"].generate(request.text)
+    try:
+        logger.info(f"Synthesizing text: {request.text}")
+        wav = await generate(request.text)
 
-#         if wav is None:
-#             raise HTTPException(status_code=500, detail="TTS model failed to generate audio.")
+        if wav is None:
+            raise HTTPException(status_code=500, detail="TTS model failed to generate audio.")
 
-#         # Convert tensor to bytes
-#         wav_tensor = (wav * 32767).to(torch.int16).cpu()
-#         audio_bytes = wav_tensor.numpy().tobytes()
+        # Convert tensor to bytes
+        wav_tensor = (wav * 32767).to(torch.int16).cpu()
+        audio_bytes = wav_tensor.numpy().tobytes()
 
-#         # It's better to stream the response
-#         return StreamingResponse(io.BytesIO(audio_bytes), media_type="application/octet-stream")
+        # It's better to stream the response
+        return StreamingResponse(io.BytesIO(audio_bytes), media_type="application/octet-stream")
 
-#     except Exception as e:
-#         logger.error(f"Error during TTS synthesis: {e}", exc_info=True)
-#         raise HTTPException(status_code=500, detail="An internal error occurred during synthesis.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error during TTS synthesis: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal error occurred during synthesis.")
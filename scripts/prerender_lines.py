@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+prerender_lines.py
+Batch-synthesize a scene's stock lines (asides, persona handoff lines and
+entrances, the lines played as written) into the API's audio cache, using
+the voice for each speaker from the scene's tts.voice_map.
+
+Usage:
+  python scripts/prerender_lines.py                                   # default scene, local TTS service
+  python scripts/prerender_lines.py --scene scenes/family_party.yaml --tts-url http://localhost:8010
+  python scripts/prerender_lines.py --list                            # print lines, don't synthesize
+"""
+
+from __future__ import annotations
+import argparse, asyncio, os, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path: sys.path.insert(0, str(ROOT))
+
+from app.api.main.orchestrator.nlg import AUDIO_FORMAT
+from app.api.main.orchestrator.state import SceneState
+from app.api.main.orchestrator.tts_client import RemoteTTS
+from app.api.main.orchestrator.warmup import collect_stock_lines, prerender_stock_lines
+
+DEFAULT_SCENE = Path("scenes/family_party.yaml")
+DEFAULT_TTS_URL = os.getenv("TTS_BASE_URL", "http://localhost:8010")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-render scene and persona stock lines into the audio cache")
+    ap.add_argument("--scene", type=Path, default=DEFAULT_SCENE)
+    ap.add_argument("--tts-url", default=DEFAULT_TTS_URL, help="Base URL of the TTS service")
+    ap.add_argument("--list", action="store_true", help="List the stock lines and exit")
+    args = ap.parse_args()
+
+    if not args.scene.exists():
+        print(f"ERROR: scene not found: {args.scene}", file=sys.stderr)
+        sys.exit(1)
+
+    state = SceneState.from_yaml(args.scene)
+    lines = collect_stock_lines(state)
+    if args.list:
+        for speaker, line in lines:
+            print(f"{speaker:>10}: {line}")
+        return
+
+    # Same format as the API's cache entries, or they'd hold the wrong bytes.
+    tts = RemoteTTS(args.tts_url, format=AUDIO_FORMAT)
+    if not tts.probe():
+        print(f"ERROR: TTS service not reachable at {args.tts_url}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        cached = asyncio.run(prerender_stock_lines(state, tts))
+    finally:
+        tts.close()
+
+    print("\n=== prerender summary ===")
+    print(f"Scene:    {args.scene}")
+    print(f"TTS:      {args.tts_url} ({tts.model_id}, {AUDIO_FORMAT})")
+    print(f"Lines:    {len(lines)}")
+    print(f"Cached:   {cached}")
+    if cached < len(lines):
+        print(f"  [!] {len(lines) - cached} failed; see errors above")
+    print("Done.\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Synthesis backends for the TTS service.
+A backend yields 16-bit mono PCM in chunks as it produces them, so the
+streaming endpoint can start sending before synthesis is finished.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator
+import math
+import numpy as np
+
+
+class SynthBackend(ABC):
+    """Abstract base class for synthesis backends."""
+    sample_rate = 22050
+
+    @abstractmethod
+    def stream_pcm(self, text: str, voice: str | None = None) -> Iterator[bytes]:
+        """Yields 16-bit mono PCM at `sample_rate` as it is synthesized."""
+        pass
+
+    def synthesize(self, text: str, voice: str | None = None) -> bytes:
+        return b"".join(self.stream_pcm(text, voice))
+
+
+class FallbackBackend(SynthBackend):
+    """Two-tone hum shaped like an utterance; stands in until a real model is wired."""
+    chunk_s = 0.1
+
+    def stream_pcm(self, text: str, voice: str | None = None) -> Iterator[bytes]:
+        sr = self.sample_rate
+        dur = min(2.0 + 0.025 * len(text or "test"), 6.0)
+        total = int(sr * dur)
+        head, tail = int(0.05*sr), int(0.08*sr)
+        step = int(sr * self.chunk_s)
+        for start in range(0, total, step):
+            n = np.arange(start, min(start + step, total))
+            t = n / sr
+            sig = 0.25*np.sin(2*math.pi*190*t) + 0.18*np.sin(2*math.pi*310*t) + 0.03*np.random.randn(n.size)
+            a = np.where(n < head, 0.2 + 0.8*n/max(head - 1, 1), 1.0)
+            a = np.minimum(a, np.where(n >= total - tail, (total - 1 - n)/max(tail - 1, 1), 1.0))
+            sig = (sig * a * 0.6).astype(np.float32)
+            yield (sig * 32767).astype(np.int16).tobytes()
+
+
+BACKENDS = {"fallback": FallbackBackend}
+
+def get_backend(name: str) -> SynthBackend:
+    # Future: register 'chatterbox' here; unknown names use the fallback.
+    return BACKENDS.get(name, FallbackBackend)()
@@ -0,0 +1,111 @@
+"""
+Output codecs for the TTS service.
+Backends produce 16-bit mono PCM; an encoder turns that chunk stream into
+the bytes a response carries. WAV is always available. Opus (in an Ogg
+container, ~24 kbit/s instead of ~350) needs an `ffmpeg` binary with
+libopus on the PATH and is only offered when one is found.
+
+Encoders are blocking iterators: they run in the request's threadpool
+thread, never on the event loop, and emit output as soon as the encoder
+produces it, so streamed responses stay streamed.
+"""
+from __future__ import annotations
+import io
+import os
+import shutil
+import struct
+import subprocess
+from typing import Iterator
+
+FFMPEG = os.getenv("TTS_FFMPEG", "ffmpeg")
+OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "24k")
+# Ogg page length in microseconds; short pages keep streamed output flowing.
+OGG_PAGE_US = 20000
+
+MEDIA_TYPES = {"wav": "audio/wav", "opus": "audio/ogg"}
+
+# ---------- WAV ----------
+STREAMING_SIZE = 0xFFFFFFFF  # "unknown length"; browsers play until the stream ends
+
+def wav_header(sr: int, data_size: int | None = None) -> bytes:
+    riff_size = STREAMING_SIZE if data_size is None else 36 + data_size
+    buf = io.BytesIO()
+    buf.write(b"RIFF")
+    buf.write(struct.pack("<I", riff_size))
+    buf.write(b"WAVEfmt ")
+    buf.write(struct.pack("<IHHIIHH", 16, 1, 1, sr, sr*2, 2, 16))
+    buf.write(b"data")
+    buf.write(struct.pack("<I", STREAMING_SIZE if data_size is None else data_size))
+    return buf.getvalue()
+
+def encode_wav(chunks: Iterator[bytes], sr: int) -> Iterator[bytes]:
+    yield wav_header(sr)
+    yield from chunks
+
+# ---------- Opus ----------
+def opus_available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+def encode_opus(chunks: Iterator[bytes], sr: int) -> Iterator[bytes]:
+    """
+    Pipes PCM chunks through ffmpeg and yields Ogg/Opus bytes as they come
+    out. Input is written one chunk at a time and output drained in between
+    without blocking, so one thread suffices and a pipe never fills up.
+    Closing the iterator early stops both ffmpeg and the PCM source.
+    """
+    proc = subprocess.Popen(
+        [FFMPEG, "-hide_banner", "-loglevel", "error",
+         "-f", "s16le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+         "-page_duration", str(OGG_PAGE_US), "-flush_packets", "1",
+         "-f", "ogg", "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    out = proc.stdout.fileno()
+    os.set_blocking(out, False)
+    try:
+        for chunk in chunks:
+            proc.stdin.write(chunk)
+            proc.stdin.flush()
+            while True:
+                try:
+                    data = os.read(out, 65536)
+                except BlockingIOError:
+                    break
+                if not data:
+                    break
+                yield data
+        proc.stdin.close()
+        os.set_blocking(out, True)
+        while data := os.read(out, 65536):
+            yield data
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {proc.returncode}")
+    finally:
+        getattr(chunks, "close", lambda: None)()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except (OSError, ValueError):
+                pass
+
+ENCODERS = {"wav": encode_wav, "opus": encode_opus}
+
+def available_formats() -> list[str]:
+    return ["wav", "opus"] if opus_available() else ["wav"]
+
+def negotiate(requested: str | None, accept: str | None) -> str:
+    """
+    Picks the response format: an explicit `format` wins, then the Accept
+    header; anything this host can't produce falls back to WAV.
+    """
+    formats = available_formats()
+    if requested:
+        return requested if requested in formats else "wav"
+    accept = (accept or "").lower()
+    if "opus" in formats and ("audio/ogg" in accept or "audio/opus" in accept):
+        return "opus"
+    return "wav"
@@ -1,7 +1,14 @@
-from fastapi import FastAPI, Response, Query
+from fastapi import FastAPI, Header, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import os, io, math, struct
-import numpy as np
+from typing import Iterator
+import os
+
+from services.tts.backends import get_backend
+from services.tts.codecs import ENCODERS, MEDIA_TYPES, available_formats, negotiate, wav_header
+from services.tts import metrics
+from services.tts.pool import WorkerPool
 
 app = FastAPI()
 BACKEND = os.getenv("TTS_BACKEND", "fallback")  # fallback | browser | chatterbox (future)
@@ -9,42 +16,92 @@ BACKEND = os.getenv("TTS_BACKEND", "fallback")  # fallback | browser | chatterbo
 class TTSIn(BaseModel):
     text: str
     voice: str | None = None
+    format: str | None = None  # wav | opus; defaults to the Accept header, then wav
+
+# Worker-pool mode: TTS_WORKERS > 0 synthesizes in that many processes,
+# each loading the backend once. 0 synthesizes in the request thread.
+WORKERS = int(os.getenv("TTS_WORKERS", "0"))
+THREADS_PER_WORKER = int(os.getenv("TTS_THREADS_PER_WORKER", "1"))
+PIN_CPUS = os.getenv("TTS_PIN_CPUS", "0") == "1"
+STALL_TIMEOUT_S = float(os.getenv("TTS_WORKER_STALL_S", "30"))
+
+backend = get_backend(BACKEND)
+pool = WorkerPool(
+    BACKEND,
+    workers=WORKERS,
+    threads_per_worker=THREADS_PER_WORKER,
+    pin_cpus=PIN_CPUS,
+    stall_timeout_s=STALL_TIMEOUT_S,
+) if WORKERS > 0 else None
+
+@app.on_event("startup")
+def startup():
+    if pool:
+        pool.start()
+        metrics.POOL_QUEUE_DEPTH.set_function(lambda: pool.queue_depth)
+        metrics.POOL_RESTARTS.set_function(lambda: pool.restarts)
+
+@app.on_event("shutdown")
+def shutdown():
+    if pool:
+        pool.stop()
 
 @app.get("/health")
 def health():
-    return {"ok": True, "backend": BACKEND}
-
-def _fallback_wav_bytes(text: str, sr: int = 22050) -> bytes:
-    dur = min(2.0 + 0.025 * len(text or "test"), 6.0)
-    t = np.linspace(0, dur, int(sr * dur), endpoint=False)
-    sig = 0.25*np.sin(2*math.pi*190*t) + 0.18*np.sin(2*math.pi*310*t) + 0.03*np.random.randn(len(t))
-    env_head = np.linspace(0.2, 1.0, int(0.05*sr))
-    env_tail = np.linspace(1.0, 0.0, int(0.08*sr))
-    a = np.ones_like(sig)
-    a[:env_head.size] = env_head
-    a[-env_tail.size:] = np.minimum(a[-env_tail.size:], env_tail)
-    sig = (sig * a * 0.6).astype(np.float32)
-
-    pcm = (sig * 32767).astype(np.int16).tobytes()
-    data_size = len(pcm)
-    buf = io.BytesIO()
-    buf.write(b"RIFF")
-    buf.write(struct.pack("<I", 36 + data_size))
-    buf.write(b"WAVEfmt ")
-    buf.write(struct.pack("<IHHIIHH", 16, 1, 1, sr, sr*2, 2, 16))
-    buf.write(b"data")
-    buf.write(struct.pack("<I", data_size))
-    buf.write(pcm)
-    return buf.getvalue()
+    info = {"ok": True, "backend": BACKEND, "formats": available_formats()}
+    if pool:
+        info.update(workers=WORKERS, queue_depth=pool.queue_depth, restarts=pool.restarts)
+    return info
+
+@app.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+def _pcm_stream(text: str, voice: str | None, endpoint: str, fmt: str) -> Iterator[bytes]:
+    chunks = pool.stream(text, voice) if pool else backend.stream_pcm(text, voice)
+    return metrics.timed(chunks, endpoint, fmt)
+
+def _encoded(text: str, voice: str | None, fmt: str, endpoint: str) -> Iterator[bytes]:
+    return ENCODERS[fmt](_pcm_stream(text, voice, endpoint, fmt), backend.sample_rate)
+
+async def _audio_bytes(request: Request, text: str, voice: str | None, fmt: str) -> bytes | None:
+    """
+    Synthesizes and encodes a whole line off the event loop. Returns None,
+    having stopped synthesis, if the caller disconnects first.
+    """
+    # WAV is assembled here so its header can carry the real length.
+    chunks = _pcm_stream(text, voice, "tts", fmt) if fmt == "wav" else _encoded(text, voice, fmt, "tts")
+    out = []
+    try:
+        while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+            if await request.is_disconnected():
+                return None
+            out.append(chunk)
+    finally:
+        getattr(chunks, "close", lambda: None)()
+    data = b"".join(out)
+    if fmt == "wav":
+        return wav_header(backend.sample_rate, len(data)) + data
+    return data
 
 @app.post("/tts")
-def tts(body: TTSIn):
+async def tts(body: TTSIn, request: Request, accept: str | None = Header(None)):
     # Future: branch on BACKEND == 'chatterbox' to synth real speech
-    wav = _fallback_wav_bytes(body.text)
-    return Response(content=wav, media_type="audio/wav")
+    fmt = negotiate(body.format, accept)
+    audio = await _audio_bytes(request, body.text, body.voice, fmt)
+    if audio is None:
+        return Response(status_code=499)  # client closed the request
+    return Response(content=audio, media_type=MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
 
 @app.get("/tts_stream")
-def tts_stream(text: str = Query(""), voice: str | None = None):
-    # Simple non-chunked fallback (still works for browsers)
-    wav = _fallback_wav_bytes(text)
-    return Response(content=wav, media_type="audio/wav")
+def tts_stream(
+    text: str = Query(""),
+    voice: str | None = None,
+    format: str | None = None,
+    accept: str | None = Header(None),
+):
+    # WAV: header first, then PCM frames as the backend produces them.
+    # Opus: Ogg pages as the encoder emits them.
+    fmt = negotiate(format, accept)
+    return StreamingResponse(_encoded(text, voice, fmt, "tts_stream"), media_type=MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
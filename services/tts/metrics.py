@@ -0,0 +1,63 @@
+"""
+Metrics for the TTS service, served on /metrics in the Prometheus text
+format: synthesis latency per request (to the backend's first PCM chunk
+and to its last), time spent waiting for a pool worker, and the pool's
+queue depth. Encoding and sending are outside these timings.
+"""
+from __future__ import annotations
+import time
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_SECONDS = Histogram(
+    "tts_request_seconds",
+    "Time to synthesize a whole line.",
+    ["endpoint", "format"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+FIRST_AUDIO_SECONDS = Histogram(
+    "tts_first_audio_seconds",
+    "Time until a request's first PCM chunk was synthesized.",
+    ["endpoint", "format"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "tts_pool_wait_seconds",
+    "Time a request waited for a free synthesis worker.",
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+IN_FLIGHT = Gauge("tts_requests_in_flight", "Requests being synthesized.", registry=REGISTRY)
+POOL_QUEUE_DEPTH = Gauge("tts_pool_queue_depth", "Requests waiting for a synthesis worker.", registry=REGISTRY)
+POOL_RESTARTS = Gauge("tts_pool_restarts", "Synthesis workers replaced since startup.", registry=REGISTRY)
+
+
+def timed(chunks: Iterator[bytes], endpoint: str, fmt: str) -> Iterator[bytes]:
+    """Passes PCM `chunks` through, recording time to the first one and to the end."""
+    start = time.perf_counter()
+    first = True
+    completed = False
+    IN_FLIGHT.inc()
+    try:
+        for chunk in chunks:
+            if first:
+                FIRST_AUDIO_SECONDS.labels(endpoint, fmt).observe(time.perf_counter() - start)
+                first = False
+            yield chunk
+        completed = True
+    finally:
+        IN_FLIGHT.dec()
+        getattr(chunks, "close", lambda: None)()
+        if completed:  # abandoned requests would skew the distribution
+            REQUEST_SECONDS.labels(endpoint, fmt).observe(time.perf_counter() - start)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
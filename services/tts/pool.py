@@ -0,0 +1,245 @@
+"""
+Multi-process synthesis pool.
+N worker processes each load the backend once and take requests from one
+shared queue, so a TTS host uses all its cores without the workers fighting
+over the GIL or over torch's thread pool. Each worker talks to the parent
+over its own pipe; a worker that stops making progress is killed and
+replaced without disturbing the others.
+"""
+from __future__ import annotations
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Iterator
+
+from services.tts.metrics import POOL_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+# Sent to a worker to abandon the request it is working on.
+CANCEL = "cancel"
+# How often a relay checks whether its caller has gone away.
+CANCEL_POLL_S = 0.1
+
+
+class WorkerError(RuntimeError):
+    """Raised to a caller whose request failed or whose worker was restarted."""
+
+
+def _worker_main(backend_name: str, threads: int, cpus: list[int] | None, conn):
+    # Thread limits must be in the environment before numpy/torch load.
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from services.tts.backends import get_backend
+    backend = get_backend(backend_name)
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            return
+        if item is None:
+            return
+        if item == CANCEL:
+            continue  # arrived after the request had already finished
+        text, voice = item
+        try:
+            chunks = backend.stream_pcm(text, voice)
+            for chunk in chunks:
+                conn.send(("chunk", chunk))
+                if conn.poll() and conn.recv() == CANCEL:
+                    getattr(chunks, "close", lambda: None)()
+                    break
+            conn.send(("done", None))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        backend_name: str,
+        workers: int,
+        threads_per_worker: int = 1,
+        pin_cpus: bool = False,
+        stall_timeout_s: float = 30.0,
+        load_timeout_s: float = 300.0,
+    ):
+        """
+        Args:
+            backend_name: Backend each worker loads (see services.tts.backends).
+            workers: Number of synthesis processes.
+            threads_per_worker: Math-library/torch threads inside each worker.
+            pin_cpus: Pin each worker to its own block of `threads_per_worker` cores.
+            stall_timeout_s: A worker with no output for this long on a request is restarted.
+            load_timeout_s: How long a new worker may take to load its model.
+        """
+        self.backend_name = backend_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.pin_cpus = pin_cpus
+        self.stall_timeout_s = stall_timeout_s
+        self.load_timeout_s = load_timeout_s
+
+        self._ctx = mp.get_context("spawn")
+        # Shared request queue: (text, voice, reply queue, cancelled event,
+        # enqueue time). None stops a slot.
+        self._pending: queue.Queue = queue.Queue()
+        self._procs: dict[int, mp.Process] = {}
+        self._threads: list[threading.Thread] = []
+        self._running = False
+        self.restarts = 0
+
+    # ----- lifecycle -----
+
+    def _cpus_for(self, worker_id: int) -> list[int] | None:
+        if not self.pin_cpus:
+            return None
+        n = os.cpu_count() or 1
+        start = worker_id * self.threads_per_worker
+        return [(start + i) % n for i in range(self.threads_per_worker)]
+
+    def _spawn(self, worker_id: int):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.backend_name, self.threads_per_worker, self._cpus_for(worker_id), child_conn),
+            name=f"tts-worker-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self._procs[worker_id] = proc
+        return parent_conn, proc
+
+    def _kill(self, worker_id: int, conn, reason: str):
+        proc = self._procs.get(worker_id)
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+            proc.join(1.0)
+        conn.close()
+        if self._running:
+            logger.warning(f"Restarting TTS worker {worker_id}: {reason}")
+            self.restarts += 1
+
+    def start(self):
+        self._running = True
+        for worker_id in range(self.workers):
+            t = threading.Thread(target=self._serve, args=(worker_id,), name=f"tts-pool-{worker_id}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"Started {self.workers} TTS workers ({self.threads_per_worker} threads each).")
+
+    def stop(self, timeout_s: float = 5.0):
+        self._running = False
+        for _ in self._threads:
+            self._pending.put(None)
+        for t in self._threads:
+            t.join(timeout_s)
+        # Fail anything that never reached a worker.
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[2].put(("error", "TTS pool stopped."))
+
+    # ----- per-worker slot -----
+
+    def _serve(self, worker_id: int):
+        """Feeds one worker from the shared queue, replacing it when it dies or stalls."""
+        while self._running:
+            conn, proc = self._spawn(worker_id)
+            if not conn.poll(self.load_timeout_s):
+                self._kill(worker_id, conn, "model did not load in time")
+                continue
+            try:
+                conn.recv()  # "ready"
+            except EOFError:
+                self._kill(worker_id, conn, f"exited while loading (code {proc.exitcode})")
+                continue
+
+            while True:
+                item = self._pending.get()
+                if item is None:
+                    conn.send(None)
+                    proc.join(1.0)
+                    conn.close()
+                    return
+                text, voice, reply, cancelled, queued_at = item
+                if cancelled.is_set():
+                    continue  # the caller gave up while it was queued
+                POOL_WAIT_SECONDS.observe(time.monotonic() - queued_at)
+                if not proc.is_alive():
+                    # Died while idle; hand the request back and replace it.
+                    self._pending.put(item)
+                    self._kill(worker_id, conn, f"exited with code {proc.exitcode}")
+                    break
+                problem = self._relay(conn, text, voice, reply, cancelled)
+                if problem:
+                    reply.put(("error", f"TTS worker restarted: {problem}"))
+                    self._kill(worker_id, conn, problem)
+                    break
+
+    def _relay(self, conn, text: str, voice: str | None, reply: queue.Queue, cancelled: threading.Event) -> str | None:
+        """Runs one request on a worker. Returns why the worker must be replaced, if it must."""
+        try:
+            conn.send((text, voice))
+            stall_at = time.monotonic() + self.stall_timeout_s
+            cancel_sent = False
+            while True:
+                if cancelled.is_set() and not cancel_sent:
+                    conn.send(CANCEL)
+                    cancel_sent = True
+                if not conn.poll(CANCEL_POLL_S):
+                    if time.monotonic() > stall_at:
+                        return f"no progress for {self.stall_timeout_s:.0f}s"
+                    continue
+                stall_at = time.monotonic() + self.stall_timeout_s
+                kind, payload = conn.recv()
+                reply.put((kind, payload))
+                if kind in ("done", "error"):
+                    return None
+        except (EOFError, OSError) as e:
+            return f"worker connection lost ({type(e).__name__})"
+
+    # ----- requests -----
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending.qsize()
+
+    def stream(self, text: str, voice: str | None = None) -> Iterator[bytes]:
+        """Yields PCM chunks for `text` as a worker produces them. Blocking."""
+        reply: queue.Queue = queue.Queue()
+        cancelled = threading.Event()
+        self._pending.put((text, voice, reply, cancelled, time.monotonic()))
+        try:
+            while True:
+                kind, payload = reply.get()
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    raise WorkerError(payload)
+        finally:
+            # Closing the generator early (e.g. the client hung up) cancels the request.
+            cancelled.set()
+
+    def synthesize(self, text: str, voice: str | None = None) -> bytes:
+        return b"".join(self.stream(text, voice))